@@ -0,0 +1,206 @@
+"""
+Chip Authenticity
+Reference-based fake detection with cached template descriptors
+"""
+
+import cv2
+import numpy as np
+
+from templates import CHIP_TYPES, asset_path, cached, load_templates
+
+LEVEL_FIELDS = ('size', 'gray', 'chroma', 'mask', 'mask_u8', 'count')
+
+
+class ReferenceAuthenticator:
+    """Score chip crops against precomputed reference descriptors per chip type"""
+
+    def __init__(self, references, threshold=0.05, scales=(0.95, 1.0, 1.05), angles=(-6, -3, 0, 3, 6),
+                 max_size=96, coarse_factor=2, tolerance=0.4, chroma_tolerance=16, descriptors=None):
+        """
+        Precompute descriptors for every reference
+
+        Args:
+            references: Dict of chip type -> BGR or BGRA reference image
+            threshold: Fraction of differing pixels above which a chip is fake
+                       (the simulator's 5% rule)
+            scales, angles: Poses the references are rendered at, so small
+                            framing and rotation errors are not read as fakes
+            max_size: Longest side of the full-resolution descriptor
+            coarse_factor: Downscale of the coarse descriptor checked first
+            tolerance: Per-pixel lightness difference, in standard deviations of
+                       the normalised lightness, that counts as different
+            chroma_tolerance: Per-pixel Lab a*/b* difference that counts as different
+            descriptors: Arrays from descriptor_arrays() built with the same
+                         parameters, used instead of rendering the references
+        """
+        self.threshold = threshold
+        self.tolerance = tolerance
+        self.chroma_tolerance = chroma_tolerance
+        self.descriptors = {}
+
+        poses = [(s, a) for s in scales for a in angles]
+        self.identity = poses.index((1.0, 0)) if (1.0, 0) in poses else len(poses) // 2
+
+        if descriptors is not None:
+            for chip_type in references:
+                levels = {level: {field: descriptors[f"{chip_type}/{level}/{field}"] for field in LEVEL_FIELDS}
+                          for level in ('fine', 'coarse')}
+                for level in levels.values():
+                    level['size'] = tuple(int(v) for v in level['size'])
+                self.descriptors[chip_type] = {**levels, 'poses': poses}
+            return
+
+        for chip_type, image in references.items():
+            h, w = image.shape[:2]
+            fit = min(1.0, max_size / max(h, w))
+            fine_size = (max(1, int(w * fit)), max(1, int(h * fit)))
+            coarse_size = (max(1, fine_size[0] // coarse_factor), max(1, fine_size[1] // coarse_factor))
+            self.descriptors[chip_type] = {
+                'fine': self.build_level(image, fine_size, poses),
+                'coarse': self.build_level(image, coarse_size, poses),
+                'poses': poses
+            }
+
+    @classmethod
+    def from_assets(cls, assets_dir=None, use_cache=True, **kwargs):
+        """
+        Build from the green-screen chip photos in assets/
+
+        The rendered descriptors are kept in the template cache, keyed by the
+        photos and the parameters, so later starts skip rendering them.
+        """
+        references = load_templates(assets_dir=assets_dir, use_cache=use_cache)
+        if not references:
+            return cls({}, **kwargs)
+
+        sources = [asset_path(t, assets_dir) for t in CHIP_TYPES if t in references]
+        descriptors = cached('authenticator', (sorted(references), sorted(kwargs.items())), sources,
+                             lambda: cls(references, **kwargs).descriptor_arrays(), use_cache=use_cache)
+        return cls(references, descriptors=descriptors, **kwargs)
+
+    def descriptor_arrays(self):
+        """Descriptors as flat named arrays (for the template cache)"""
+        return {f"{chip_type}/{level}/{field}": np.asarray(descriptor[level][field])
+                for chip_type, descriptor in self.descriptors.items()
+                for level in ('fine', 'coarse') for field in LEVEL_FIELDS}
+
+    def build_level(self, image, size, poses):
+        """
+        Render a reference at every pose as a normalised lightness and chroma descriptor
+
+        Returns:
+            dict: 'gray' (poses, h, w) normalised lightness, 'chroma' (poses, h, w, 2)
+                  Lab a*/b*, 'mask' (poses, h, w) bool and 'count' mask pixels per pose
+        """
+        lab = cv2.cvtColor(cv2.resize(image[:, :, :3], size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2LAB)
+        if image.ndim == 3 and image.shape[2] == 4:
+            alpha = cv2.resize(image[:, :, 3], size, interpolation=cv2.INTER_AREA)
+        else:
+            alpha = np.full((size[1], size[0]), 255, dtype=np.uint8)
+
+        # Outline pixels mix chip and background, so only the chip interior is compared
+        alpha = cv2.erode(alpha, np.ones((3, 3), np.uint8), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+
+        center = (size[0] / 2, size[1] / 2)
+        labs = []
+        masks = []
+        for scale, angle in poses:
+            M = cv2.getRotationMatrix2D(center, angle, scale)
+            labs.append(cv2.warpAffine(lab, M, size, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE))
+            masks.append(cv2.warpAffine(alpha, M, size, flags=cv2.INTER_NEAREST) > 128)
+
+        labs = np.stack(labs)
+        masks = np.stack(masks)
+        return {
+            'size': size,
+            'gray': _normalise(labs[..., 0].astype(np.float32), masks),
+            'chroma': labs[..., 1:].astype(np.int16),
+            'mask': masks,
+            'mask_u8': masks[self.identity].astype(np.uint8),
+            'count': np.maximum(masks.sum(axis=(1, 2)), 1)
+        }
+
+    def describe(self, level, image):
+        """Normalise an image already resized to a level, under the identity pose mask"""
+        lightness, a, b = cv2.split(cv2.cvtColor(image, cv2.COLOR_BGR2LAB))
+        mean, std = cv2.meanStdDev(lightness, mask=level['mask_u8'])
+        gray = (lightness - np.float32(mean[0, 0])) / np.float32(max(std[0, 0], 1e-3))
+        return gray, np.dstack([a, b]).astype(np.int16)
+
+    def difference(self, level, live, pose):
+        """
+        Fraction of differing masked pixels between a described crop and a level
+
+        Args:
+            level: Descriptor level
+            live: describe() output
+            pose: Pose index, or a slice for several poses at once
+        """
+        gray, chroma = live
+        different = np.abs(gray - level['gray'][pose]) > self.tolerance
+        different |= (np.abs(chroma - level['chroma'][pose]) > self.chroma_tolerance).any(axis=-1)
+        different &= level['mask'][pose]
+        return different.sum(axis=(-2, -1)) / level['count'][pose]
+
+    def check(self, chip_type, crop, real_margin=0.8, fake_margin=3.0):
+        """
+        Decide whether a chip crop is fake
+
+        Checks get more expensive only while the verdict is unclear: first the
+        coarse descriptor at the identity pose, then the coarse descriptor at
+        every pose, and last the full-resolution descriptor at the best coarse
+        pose. A stage ends the check when the chip is far below the threshold
+        (real) or, once every pose has been tried, far above it (fake).
+
+        Args:
+            chip_type: Detected chip type
+            crop: BGR crop of the chip
+            real_margin, fake_margin: Early-exit bounds as multiples of threshold
+
+        Returns:
+            dict: is_fake, difference, pose (scale, angle) and stage
+                  ('identity', 'coarse' or 'fine')
+        """
+        descriptor = self.descriptors.get(chip_type)
+        if descriptor is None or crop.size == 0:
+            return {'is_fake': True, 'difference': 1.0, 'pose': None, 'stage': 'none'}
+        if crop.ndim == 2:
+            crop = cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR)
+        poses = descriptor['poses']
+        real_bound = self.threshold * real_margin
+
+        # The crop is resized once; the coarse level is a cheap near-integer step down from it
+        fine_level = descriptor['fine']
+        coarse_level = descriptor['coarse']
+        fine_image = cv2.resize(crop, fine_level['size'], interpolation=cv2.INTER_AREA)
+        coarse_image = cv2.resize(fine_image, coarse_level['size'], interpolation=cv2.INTER_AREA)
+        coarse_live = self.describe(coarse_level, coarse_image)
+        identity = self.difference(coarse_level, coarse_live, self.identity)
+        if identity <= real_bound:
+            return self.result(identity, poses[self.identity], 'identity')
+
+        coarse = self.difference(coarse_level, coarse_live, slice(None))
+        best = int(coarse.argmin())
+        if coarse[best] <= real_bound or coarse[best] >= self.threshold * fake_margin:
+            return self.result(coarse[best], poses[best], 'coarse')
+
+        fine = self.difference(fine_level, self.describe(fine_level, fine_image), best)
+        return self.result(fine, poses[best], 'fine')
+
+    def check_batch(self, chip_types, crops):
+        """Check several chips; see check"""
+        return [self.check(chip_type, crop) for chip_type, crop in zip(chip_types, crops)]
+
+    def result(self, difference, pose, stage):
+        """Package a verdict"""
+        difference = float(difference)
+        return {'is_fake': difference > self.threshold, 'difference': difference, 'pose': pose, 'stage': stage}
+
+
+def _normalise(grays, masks):
+    """Zero mean, unit deviation per image over its masked pixels (inputs are stacks)"""
+    counts = np.maximum(masks.sum(axis=(1, 2), keepdims=True), 1)
+    means = (grays * masks).sum(axis=(1, 2), keepdims=True) / counts
+    centred = grays - means
+    stds = np.sqrt(((centred * masks) ** 2).sum(axis=(1, 2), keepdims=True) / counts)
+    return centred / np.maximum(stds, 1e-3)
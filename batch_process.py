@@ -0,0 +1,248 @@
+"""
+Batch Processing
+Run recorded footage (video files or frame directories) through detection,
+tracking and valuation on a process pool, streaming counted chips as JSONL
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from authenticity import ReferenceAuthenticator
+from ledger import SessionLedger
+
+# Status lines go to stderr so stdout carries nothing but JSONL
+with contextlib.redirect_stdout(sys.stderr):
+    from camera_main import ChipDetector, ChipTracker
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+class FrameSource:
+    """Indexed access to the frames of a video file or a directory of images"""
+
+    def __init__(self, path):
+        """
+        Open footage
+
+        Args:
+            path: Video file, or directory whose image files (sorted by name) are the frames
+        """
+        self.path = path
+        if os.path.isdir(path):
+            self.files = sorted(os.path.join(path, f) for f in os.listdir(path)
+                                if f.lower().endswith(IMAGE_EXTENSIONS))
+            self.count = len(self.files)
+            self.fps = None
+            first = cv2.imread(self.files[0], cv2.IMREAD_COLOR) if self.files else None
+            self.height = first.shape[0] if first is not None else 0
+        else:
+            self.files = None
+            capture = cv2.VideoCapture(path)
+            if not capture.isOpened():
+                raise ValueError(f"Cannot open footage: {path}")
+            self.count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = capture.get(cv2.CAP_PROP_FPS) or None
+            self.height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            capture.release()
+
+    def frames(self, start, stop):
+        """
+        Yield (index, frame) for frames start..stop-1
+
+        Video is decoded sequentially from start, so each chunk seeks once.
+        """
+        if self.files is not None:
+            for index in range(start, min(stop, self.count)):
+                frame = cv2.imread(self.files[index], cv2.IMREAD_COLOR)
+                if frame is not None:
+                    yield index, frame
+            return
+
+        capture = cv2.VideoCapture(self.path)
+        try:
+            if start:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+            for index in range(start, stop):
+                success, frame = capture.read()
+                if not success:
+                    break
+                yield index, frame
+        finally:
+            capture.release()
+
+
+# Each pool process builds its detector once, in _init_worker
+_detector = None
+
+
+def _init_worker(settings):
+    global _detector
+    sys.stdout = sys.stderr  # Workers only report status; stdout is the parent's JSONL stream
+    authenticator = settings['authenticator'] or ReferenceAuthenticator.from_assets()
+    _detector = ChipDetector(color_ranges=settings['color_ranges'], engine=settings['engine'],
+                             detection_scale=settings['detection_scale'], scan_band=settings['scan_band'],
+                             edge_strip=settings['edge_strip'], body_range=settings['body_range'],
+                             authenticator=authenticator if authenticator.descriptors else None)
+    if settings['min_area'] is not None:
+        _detector.min_area = settings['min_area']
+
+
+def process_chunk(path, start, stop, overlap):
+    """
+    Track chips through frames start..stop-1 of the footage
+
+    Tracking starts overlap frames early so chips already on the belt have
+    the track history, and reads, of an unchunked run when the chunk begins;
+    chips crossing the scan line in the overlap belong to the previous chunk
+    and are not reported.
+
+    Returns:
+        tuple: (frames processed, list of counted-chip records)
+    """
+    source = FrameSource(path)
+    tracker = ChipTracker(_detector)
+    records = []
+    processed = 0
+
+    for index, frame in source.frames(max(0, start - overlap), stop):
+        detections = _detector.detect_chips(frame, classify=False)
+        crossed = tracker.update(frame, detections)
+        if index < start:
+            continue
+        processed += 1
+        for track in crossed:
+            records.append({
+                'frame': index,
+                'time': round(index / source.fps, 3) if source.fps else None,
+                'id': f"{start}-{track['id']}",
+                'type': track['chip_type'],
+                'digits': list(track['digits']) if track['digits'] else None,
+                'value': track['value'],
+                'authentic': not track['is_fake'],
+                'readable': track['readable']
+            })
+    return processed, records
+
+
+def detector_settings(simulator=False, min_area=None, engine='label_map', detection_scale=1.0,
+                      scan_band=None, edge_strip=0):
+    """
+    Detector configuration handed to each pool process
+
+    Args:
+        simulator: Footage was recorded from the simulator; use its chip colors, body
+                   range, chip size and references (see virtual_camera)
+        min_area: Full-resolution min chip area (detector default when None)
+        engine, detection_scale, scan_band, edge_strip: See ChipDetector
+    """
+    color_ranges = body_range = authenticator = None
+    if simulator:
+        import virtual_camera
+        from main import ConveyorSimulator
+        with contextlib.redirect_stdout(sys.stderr):
+            sim = ConveyorSimulator(seed=0)
+            color_ranges = virtual_camera.simulator_color_ranges(sim)
+            body_range = virtual_camera.simulator_body_range(sim, color_ranges)
+            authenticator = virtual_camera.simulator_authenticator(sim, color_ranges, body_range)
+        if min_area is None:
+            min_area = virtual_camera.simulator_min_chip_area(sim)
+    return {'color_ranges': color_ranges, 'body_range': body_range, 'authenticator': authenticator,
+            'min_area': min_area, 'engine': engine, 'detection_scale': detection_scale,
+            'scan_band': scan_band, 'edge_strip': edge_strip}
+
+
+def process(path, output=None, chunk_frames=900, overlap=None, workers=None, settings=None, belt_speed=3):
+    """
+    Process footage on a pool of worker processes
+
+    Chunks are handed out in order and their records written as soon as
+    every earlier chunk is done, so the JSONL stream is in frame order.
+
+    Args:
+        path: Video file or frame directory
+        output: JSONL file (stdout when None or '-')
+        chunk_frames: Frames per chunk
+        overlap: Frames each chunk re-tracks from the end of the previous one
+                 (a chip's whole transit of the frame when None)
+        workers: Pool size (CPU count when None)
+        settings: detector_settings() output (defaults when None)
+        belt_speed: Belt speed in px per frame, for the default overlap
+
+    Returns:
+        SessionLedger: In-memory totals of the counted chips
+    """
+    source = FrameSource(path)
+    if source.count <= 0:
+        raise ValueError(f"No frames in {path}")
+    if overlap is None:
+        # Shorter overlaps start chunks on chips whose tracks are missing earlier reads
+        overlap = math.ceil(source.height / belt_speed)
+    settings = settings or detector_settings()
+    chunks = [(start, min(start + chunk_frames, source.count)) for start in range(0, source.count, chunk_frames)]
+    ledger = SessionLedger('batch')
+
+    print(f"📼 {path}: {source.count} frames in {len(chunks)} chunks of {chunk_frames} "
+          f"(+{overlap} overlap)", file=sys.stderr)
+    to_stdout = output in (None, '-')
+    out = sys.stdout if to_stdout else open(output, 'w', encoding='utf-8')
+    start_time = time.perf_counter()
+    frames = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings,)) as pool:
+            results = pool.map(process_chunk, [path] * len(chunks), [start for start, _ in chunks],
+                               [stop for _, stop in chunks], [overlap] * len(chunks))
+            for done, (processed, records) in enumerate(results, 1):
+                for record in records:
+                    out.write(json.dumps(record, separators=(',', ':')) + '\n')
+                    ledger.commit(record)
+                out.flush()
+                frames += processed
+                elapsed = time.perf_counter() - start_time
+                print(f"   Chunk {done}/{len(chunks)} | {frames} frames | {ledger.count} chips | "
+                      f"{frames / elapsed:.0f} FPS", file=sys.stderr)
+    finally:
+        if not to_stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start_time
+    with contextlib.redirect_stdout(sys.stderr):
+        print(f"\n📊 Processed {frames} frames in {elapsed:.1f}s ({frames / elapsed:.0f} FPS)")
+        if source.fps:
+            print(f"   Footage: {source.count / source.fps:.0f}s ({source.count / source.fps / elapsed:.1f}x real time)")
+        print(f"   Total Value: {ledger.total_value} CR")
+        ledger.print_summary()
+        if not to_stdout:
+            print(f"   Results: {output}")
+    return ledger
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count and value the chips in recorded footage")
+    parser.add_argument('footage', help="Video file or directory of frame images")
+    parser.add_argument('-o', '--output', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-frames', type=int, default=900, help="Frames per chunk")
+    parser.add_argument('--overlap', type=int,
+                        help="Frames re-tracked at each chunk start so chips crossing the boundary count once "
+                             "(default: one belt transit of the frame)")
+    parser.add_argument('--belt-speed', type=float, default=3, help="Belt speed in px per frame")
+    parser.add_argument('--simulator', action='store_true',
+                        help="Footage comes from the simulator (its chip colors and sizes)")
+    parser.add_argument('--min-area', type=int, help="Full-resolution min chip area")
+    parser.add_argument('--engine', choices=['label_map', 'per_class'], default='label_map')
+    parser.add_argument('--scale', type=float, default=1.0, help="Detection scale (see ChipDetector)")
+    parser.add_argument('--scan-band', type=int, help="Only process this many rows around the scan line")
+    parser.add_argument('--edge-strip', type=int, default=0, help="Early-warning strip height at the belt edges")
+    args = parser.parse_args()
+
+    settings = detector_settings(args.simulator, args.min_area, args.engine, args.scale,
+                                 args.scan_band, args.edge_strip)
+    process(args.footage, args.output, args.chunk_frames, args.overlap, args.workers, settings, args.belt_speed)
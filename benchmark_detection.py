@@ -0,0 +1,185 @@
+"""
+Detection Benchmark
+Measures ChipDetector throughput and recall on simulator frames
+"""
+
+import argparse
+import time
+import sys
+import os
+
+import cv2
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from main import ConveyorSimulator
+from camera_main import ChipDetector
+from virtual_camera import frame_truth, simulator_body_range, simulator_color_ranges, simulator_min_chip_area
+
+
+def record_frames(sim, count, warmup=240, stride=2):
+    """
+    Render clean belt frames with ground truth
+
+    Args:
+        sim: ConveyorSimulator
+        count: Number of frames to record
+        warmup: Frames to run first so the belt fills up
+        stride: Simulation steps between recorded frames
+
+    Returns:
+        list: (frame, ground_truth) where ground_truth is frame_truth() output
+    """
+    for _ in sim.run_headless(frames=warmup, render=False):
+        pass
+
+    recorded = []
+    while len(recorded) < count:
+        for _ in sim.run_headless(frames=stride, render=False):
+            pass
+        recorded.append((sim.render_frame(annotate=False), frame_truth(sim)))
+
+    return recorded
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def score_detections(detections, truth, eligible=None, min_iou=0.5):
+    """
+    Match detections to ground-truth chips one to one by box overlap
+
+    Pairs are taken greedily from the highest IoU down, so each chip is
+    matched by at most one detection. Fragments and duplicates of a chip
+    are left unmatched and count as false positives.
+
+    Args:
+        detections: ChipDetector output
+        truth: (chip_type, bbox) per chip on the belt
+        eligible: Indices of chips the detector should find (all when None)
+        min_iou: Smallest box IoU that counts as a match
+
+    Returns:
+        tuple: (chips found, chips with wrong type, unmatched detections)
+    """
+    if eligible is None:
+        eligible = range(len(truth))
+    eligible = set(eligible)
+
+    pairs = []
+    for d, det in enumerate(detections):
+        for i, (_, bbox) in enumerate(truth):
+            iou = box_iou(det['bbox'], bbox)
+            if iou >= min_iou:
+                pairs.append((iou, d, i))
+    pairs.sort(reverse=True)
+
+    matched_dets = set()
+    matched_truth = set()
+    found = wrong_type = 0
+    for _, d, i in pairs:
+        if d in matched_dets or i in matched_truth:
+            continue
+        matched_dets.add(d)
+        matched_truth.add(i)
+        if i not in eligible:
+            continue
+        if detections[d]['chip_type'] == truth[i][0]:
+            found += 1
+        else:
+            wrong_type += 1
+
+    return found, wrong_type, len(detections) - len(matched_dets)
+
+
+def run_benchmark(scales, frames, min_area=None, engine='label_map', scan_band=None, edge_strip=0, use_body=True):
+    """
+    Benchmark each detection scale on the same recorded frames
+
+    min_area defaults to simulator_min_chip_area. With use_body the detector
+    finds chips by the simulator's shared body range (engine is then unused);
+    without it, by the class colours of the marks alone.
+    """
+    print("\n📊 Detection Benchmark")
+    print("="*60)
+
+    sim = ConveyorSimulator(width=1280, height=720, conveyor_speed=3, seed=0)
+    color_ranges = simulator_color_ranges(sim)
+    body_range = simulator_body_range(sim, color_ranges) if use_body else None
+    if min_area is None:
+        min_area = simulator_min_chip_area(sim)
+    recorded = record_frames(sim, frames)
+
+    # Only chips wholly inside a processed region count towards recall; chips cut by
+    # the frame edge are still matched, so detecting them is not a false positive
+    regions = ChipDetector(color_ranges=color_ranges, scan_band=scan_band,
+                           edge_strip=edge_strip).scan_regions(sim.height)
+    eligible = [[i for i, chip in enumerate(truth)
+                 if chip['whole'] and any(y0 <= chip['bbox'][1] and chip['bbox'][1] + chip['bbox'][3] <= y1
+                                          for _, y0, y1 in regions)]
+                for _, truth in recorded]
+    recorded = [(frame, [(chip['chip_type'], chip['bbox']) for chip in truth]) for frame, truth in recorded]
+    if scan_band is not None:
+        rows = sum(y1 - y0 for _, y0, y1 in regions)
+        print(f"Scan band: {scan_band}px + edge strips {edge_strip}px = {rows}/{sim.height} rows")
+    total_truth = sum(len(indices) for indices in eligible)
+
+    print(f"Frames: {len(recorded)} | Chips in view: {total_truth} | "
+          f"Engine: {'body range' if use_body else engine} | Min area: {min_area}")
+    print("-"*60)
+    print(f"{'Scale':>6} {'ms/frame':>10} {'FPS':>8} {'Recall':>8} {'Type err':>9} {'False +':>8}")
+
+    for scale in scales:
+        detector = ChipDetector(color_ranges=color_ranges, engine=engine, detection_scale=scale,
+                                scan_band=scan_band, edge_strip=edge_strip, body_range=body_range)
+        detector.min_area = min_area
+
+        found = wrong = false_pos = 0
+        elapsed = 0.0
+        for (frame, truth), indices in zip(recorded, eligible):
+            start = time.perf_counter()
+            detections = detector.detect_chips(frame)
+            elapsed += time.perf_counter() - start
+
+            f, w, u = score_detections(detections, truth, indices)
+            found += f
+            wrong += w
+            false_pos += u
+
+        ms = elapsed / len(recorded) * 1000
+        recall = found / total_truth if total_truth else 0.0
+        print(f"{scale:>6.2f} {ms:>10.2f} {1000 / ms:>8.1f} {recall:>8.1%} {wrong:>9} {false_pos:>8}")
+
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chip detection on simulator frames")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.5, 0.25],
+                        help="Detection scales to compare")
+    parser.add_argument('--frames', type=int, default=100, help="Frames to evaluate")
+    parser.add_argument('--min-area', type=int, default=None,
+                        help="Full-resolution min chip area (a quarter of the smallest simulator chip when omitted)")
+    parser.add_argument('--engine', choices=['label_map', 'per_class'], default='label_map',
+                        help="Class colour engine, used with --no-body-range")
+    parser.add_argument('--no-body-range', action='store_true',
+                        help="Find chips by the colours of their marks alone")
+    parser.add_argument('--scan-band', type=int, default=None,
+                        help="Only process this many rows around the scan line")
+    parser.add_argument('--edge-strip', type=int, default=0,
+                        help="Early-warning strip height at the top and bottom edges")
+    args = parser.parse_args()
+
+    run_benchmark(args.scales, args.frames, args.min_area, args.engine,
+                  args.scan_band, args.edge_strip, not args.no_body_range)
@@ -5,28 +5,61 @@ Real-time camera-based chip authentication and value calculation
 
 import cv2
 import time
+import threading
 import numpy as np
 from collections import deque
 import sys
 import os
 
+from ocr import DigitReader
+from authenticity import ReferenceAuthenticator
+from ledger import SessionLedger
+from pacing import FramePacer
+from instrumentation import StageProfiler
+from markers import LatencyMonitor
+
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 try:
     from sensorproject.camera_setup import CameraManager
-    from sensorproject.centroid_tracker import CentroidTracker
     CAMERA_AVAILABLE = True
 except ImportError:
     CAMERA_AVAILABLE = False
-    print("⚠️  Warning: Camera modules not found. Will use demo mode.")
+    print("⚠️  Warning: Camera modules not found. Will use the virtual camera.")
 
 
 class ChipDetector:
     """Detect and classify chips by color"""
     
-    def __init__(self, color_ranges=None):
-        """Initialize chip detector"""
+    # Label of pixels inside more than one class range (resolved by nearest range centre)
+    AMBIGUOUS = 255
+    
+    def __init__(self, color_ranges=None, engine='label_map', detection_scale=1.0,
+                 scan_band=None, edge_strip=0, digit_reader=None, min_digit_confidence=0.1,
+                 authenticator=None, body_range=None):
+        """
+        Initialize chip detector
+        
+        Args:
+            color_ranges: Per chip type HSV ranges (defaults used when None)
+            engine: 'label_map' classifies every pixel in one pass through a
+                    compiled colour table, 'per_class' runs one mask per chip type
+            detection_scale: Frame scale for finding candidates (e.g. 0.5, 0.25);
+                             digits and authenticity still use full resolution
+            scan_band: Height in px of the band around the scan line to process
+                       (None processes the whole frame)
+            edge_strip: Height in px of early-warning strips at the top and
+                        bottom belt edges, only used with scan_band
+            digit_reader: DigitReader for the chip digits (default layout when None)
+            min_digit_confidence: Reads with any digit below this confidence (margin
+                                  over the runner-up digit) are rejected
+            authenticator: ReferenceAuthenticator for the fake check (random
+                           demo verdicts when None)
+            body_range: HSV range (lower/upper) of a chip body shared by every type,
+                        for chips whose type shows only in coloured markings
+                        (see find_candidates_marked); None finds chips by class colour
+        """
         # Default HSV color ranges (will be overridden by calibration)
         if color_ranges is None:
             self.color_ranges = {
@@ -54,6 +87,34 @@ class ChipDetector:
         
         self.min_area = 2000
         self.max_area = 50000
+        
+        if engine not in ('label_map', 'per_class'):
+            raise ValueError(f"Unknown detection engine: {engine}")
+        self.engine = engine
+        self.digit_reader = digit_reader if digit_reader is not None else DigitReader()
+        self.min_digit_confidence = min_digit_confidence
+        self.authenticator = authenticator
+        self.body_range = body_range
+        self.profiler = StageProfiler(enabled=False)  # Replaced by the owning loop's profiler
+        self.set_detection_scale(detection_scale)
+        self.set_scan_band(scan_band, edge_strip)
+        self.compile_color_table()
+    
+    def set_detection_scale(self, scale):
+        """
+        Set the pyramid level candidates are searched at
+        
+        Args:
+            scale: Fraction of full resolution in (0, 1]
+        """
+        if not 0 < scale <= 1:
+            raise ValueError(f"Detection scale must be in (0, 1], got {scale}")
+        self.detection_scale = scale
+        
+        # Blur and morphology shrink with the image so they cover the same chip area
+        size = max(1, int(round(5 * scale)))
+        self.blur_size = size | 1
+        self.kernel = np.ones((size, size), np.uint8)
     
     def calibrate_chip_color(self, frame, chip_type):
         """
@@ -92,66 +153,429 @@ class ChipDetector:
             'upper': upper.astype(np.uint8),
             'mean_hsv': mean_hsv
         }
+    
+    def compile_color_table(self):
+        """
+        Compile color_ranges into lookup tables for single-pass classification.
+        HSV ranges are boxes, so membership splits per channel: each channel
+        table maps a value to a bitmask of the classes whose range contains it,
+        and a bitmask table maps the combined bits to a label. Label 0 is
+        background; label i is self.class_names[i - 1].
+        """
+        self.class_names = list(self.color_ranges.keys())
+        if len(self.class_names) > 8:
+            raise ValueError("Label map engine supports at most 8 chip classes")
+        
+        self.channel_tables = [np.zeros(256, dtype=np.uint8) for _ in range(3)]
+        centers = []
+        for bit, chip_type in enumerate(self.class_names):
+            lower = np.clip(np.asarray(self.color_ranges[chip_type]['lower'], dtype=int), 0, 255)
+            upper = np.clip(np.asarray(self.color_ranges[chip_type]['upper'], dtype=int), 0, 255)
+            for channel in range(3):
+                self.channel_tables[channel][lower[channel]:upper[channel] + 1] |= 1 << bit
+            centers.append((lower + upper) / 2.0)
         
-    def detect_chips(self, frame):
+        # Single-class bitmasks map to their label; overlaps are marked AMBIGUOUS
+        self.label_table = np.full(256, self.AMBIGUOUS, dtype=np.uint8)
+        self.label_table[0] = 0
+        for bit in range(len(self.class_names)):
+            self.label_table[1 << bit] = bit + 1
+        
+        # Label map with background raised above every class, for finding where classes meet
+        self.seam_table = np.arange(256, dtype=np.uint8)
+        self.seam_table[0] = self.AMBIGUOUS
+        
+        # Ranges of two classes overlap only if they share values in all three channels
+        count = len(self.class_names)
+        self.overlapping = any(all(((table >> i) & (table >> j) & 1).any() for table in self.channel_tables)
+                               for i in range(count) for j in range(i + 1, count))
+        
+        # Overlaps go to the class whose range centre is nearest in normalised HSV
+        self.hsv_scale = np.array([180.0, 255.0, 255.0], dtype=np.float32)
+        self.class_centers = np.array(centers, dtype=np.float32).reshape(-1, 3) / self.hsv_scale
+    
+    def classify_pixels(self, hsv):
+        """
+        Label every pixel with its chip class in one pass
+        
+        Args:
+            hsv: HSV image
+            
+        Returns:
+            np.ndarray: uint8 label map (0 = background)
+        """
+        h, s, v = cv2.split(hsv)
+        bits = cv2.LUT(h, self.channel_tables[0])
+        cv2.bitwise_and(bits, cv2.LUT(s, self.channel_tables[1]), dst=bits)
+        cv2.bitwise_and(bits, cv2.LUT(v, self.channel_tables[2]), dst=bits)
+        labels = cv2.LUT(bits, self.label_table)
+        if not self.overlapping:
+            return labels
+        
+        points = cv2.findNonZero(cv2.compare(labels, self.AMBIGUOUS - 1, cv2.CMP_GT))
+        if points is not None:
+            points = points.reshape(-1, 2)
+            ambiguous = (points[:, 1], points[:, 0])
+            pixels = hsv[ambiguous].astype(np.float32) / self.hsv_scale
+            dist = ((pixels[:, None, :] - self.class_centers[None, :, :]) ** 2).sum(axis=2)
+            member = (bits[ambiguous][:, None] >> np.arange(len(self.class_names), dtype=np.uint8)) & 1
+            dist[member == 0] = np.inf
+            labels[ambiguous] = dist.argmin(axis=1) + 1
+        
+        return labels
+    
+    def set_scan_band(self, band_height, edge_strip=0):
+        """
+        Restrict detection to horizontal bands of a fixed conveyor install
+        
+        Args:
+            band_height: Height in px of the band centred on the scan line
+                         (height // 2); should cover a whole chip. None
+                         processes the whole frame
+            edge_strip: Height in px of strips at the top and bottom frame
+                        edges that warn of chips entering or leaving
+        """
+        if band_height is not None and band_height <= 0:
+            raise ValueError(f"Scan band height must be positive, got {band_height}")
+        if edge_strip < 0:
+            raise ValueError(f"Edge strip height must not be negative, got {edge_strip}")
+        self.scan_band = band_height
+        self.edge_strip = edge_strip
+    
+    def scan_regions(self, height):
+        """
+        Rows of the frame the detector processes
+        
+        Args:
+            height: Frame height
+            
+        Returns:
+            list: (zone, y_start, y_end) per region, zone being 'full', 'scan',
+                  'top_edge' or 'bottom_edge'
+        """
+        if self.scan_band is None:
+            return [('full', 0, height)]
+        
+        scan_y = height // 2
+        band_start = max(0, scan_y - self.scan_band // 2)
+        band_end = min(height, band_start + self.scan_band)
+        regions = [('scan', band_start, band_end)]
+        
+        # Edge strips are clipped so no row is processed twice
+        if self.edge_strip:
+            top_end = min(self.edge_strip, band_start)
+            if top_end > 0:
+                regions.insert(0, ('top_edge', 0, top_end))
+            bottom_start = max(height - self.edge_strip, band_end)
+            if bottom_start < height:
+                regions.append(('bottom_edge', bottom_start, height))
+        return regions
+    
+    def detect_chips(self, frame, classify=True):
         """
         Detect chips in frame by color
         
         Args:
             frame: BGR image
+            classify: Also read digits and check authenticity (see classify_chips);
+                      when False only location and chip type are filled in
             
         Returns:
             detections: List of dicts with chip info
         """
-        # Preprocess
-        blurred = cv2.GaussianBlur(frame, (5, 5), 0)
-        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
-        
         detections = []
+        for zone, y_start, y_end in self.scan_regions(frame.shape[0]):
+            for chip_type, (x, y, w, h), area in self.find_candidates(frame[y_start:y_end]):
+                y += y_start
+                detection = {
+                    'chip_type': chip_type,
+                    'bbox': (x, y, w, h),
+                    'centroid': (x + w//2, y + h//2),
+                    'area': area,
+                    'color': self.color_ranges[chip_type]['bgr_color'],
+                    'zone': zone
+                }
+                detections.append(detection)
         
-        # Detect each chip type
-        for chip_type, color_info in self.color_ranges.items():
-            # Create color mask
-            mask = cv2.inRange(hsv, color_info['lower'], color_info['upper'])
+        if classify:
+            for detection, read in zip(detections, self.classify_chips(frame, detections)):
+                detection.update(read)
+        
+        return detections
+    
+    def classify_chips(self, frame, chips):
+        """
+        Read digits and check authenticity of a batch of chips at full resolution
+        
+        Args:
+            frame: BGR image
+            chips: Dicts with 'chip_type' and 'bbox' (x, y, w, h) in frame coordinates
+            
+        Returns:
+            list: Per chip dict of digits, digit_confidence, value, readable,
+                  is_fake and difference (from the reference, None in demo mode)
+        """
+        rois = [frame[y:y+h, x:x+w] for x, y, w, h in (chip['bbox'] for chip in chips)]
+        
+        # Compare against the reference templates, or random 20% fakes for demo
+        with self.profiler.stage('authenticity'):
+            if self.authenticator is not None:
+                verdicts = self.authenticator.check_batch([chip['chip_type'] for chip in chips], rois)
+            else:
+                verdicts = [{'is_fake': np.random.random() < 0.2, 'difference': None} for _ in chips]
+        
+        with self.profiler.stage('ocr'):
+            reads = self.extract_digits_batch(rois)
+        
+        results = []
+        for chip, (digits, confidences), verdict in zip(chips, reads, verdicts):
+            value = self.calculate_value(chip['chip_type'], digits, confidences)
+            is_fake = verdict['is_fake']
+            
+            results.append({
+                'digits': digits,
+                'digit_confidence': min(confidences),
+                'readable': value is not None,
+                'value': value if value is not None and not is_fake else 0,
+                'is_fake': is_fake,
+                'difference': verdict['difference']
+            })
+        return results
+    
+    def find_candidates(self, image):
+        """
+        Find chip candidates in an image (a whole frame or one scan region)
+        
+        Args:
+            image: BGR image
             
-            # Clean up mask
-            kernel = np.ones((5, 5), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        Returns:
+            list: (chip_type, bbox, area) per candidate, in image coordinates
+        """
+        # Preprocess, on a downscaled copy when running a pyramid level
+        scale = self.detection_scale
+        with self.profiler.stage('blur_hsv'):
+            small = image
+            if scale < 1:
+                small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            blurred = cv2.GaussianBlur(small, (self.blur_size, self.blur_size), 0) if self.blur_size > 1 else small
+            hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
+        
+        if self.body_range is not None:
+            candidates = self.find_candidates_marked(hsv)
+        elif self.engine == 'label_map':
+            candidates = self.find_candidates_label_map(hsv)
+        else:
+            candidates = self.find_candidates_per_class(hsv)
+        if scale < 1:
+            candidates = [self.scale_candidate(c, image.shape) for c in candidates]
+        return candidates
+    
+    def scale_candidate(self, candidate, frame_shape):
+        """Map a candidate found at detection_scale back to full-resolution coordinates"""
+        chip_type, (x, y, w, h), area = candidate
+        scale = self.detection_scale
+        x0, y0 = int(x / scale), int(y / scale)
+        x1 = min(frame_shape[1], int(np.ceil((x + w) / scale)))
+        y1 = min(frame_shape[0], int(np.ceil((y + h) / scale)))
+        return chip_type, (x0, y0, x1 - x0, y1 - y0), area / (scale * scale)
+    
+    def area_limits(self):
+        """Area filter bounds in detection_scale pixels"""
+        area_scale = self.detection_scale ** 2
+        return self.min_area * area_scale, self.max_area * area_scale
+    
+    def find_candidates_label_map(self, hsv):
+        """
+        Find chips of every class from one label map
+        
+        Args:
+            hsv: HSV image
+            
+        Returns:
+            list: (chip_type, bbox, area) per candidate
+        """
+        with self.profiler.stage('masks'):
+            labels = self.classify_pixels(hsv)
             
-            # Find contours
+            # One morphology pass over the union of all classes
+            mask = cv2.compare(labels, 0, cv2.CMP_GT)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        
+        # One contour pass finds the chips of every class
+        with self.profiler.stage('contours'):
             contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            min_area, max_area = self.area_limits()
             
+            candidates = []
             for contour in contours:
                 area = cv2.contourArea(contour)
-                
-                # Filter by area
-                if area < self.min_area or area > self.max_area:
+                if area < min_area:
                     continue
                 
-                # Get bounding box
+                # The chip takes the class of its labelled pixels
                 x, y, w, h = cv2.boundingRect(contour)
+                box_labels = labels[y:y+h, x:x+w]
+                present = np.flatnonzero(np.bincount(box_labels.reshape(-1), minlength=len(self.class_names) + 1)[1:])
+                if len(present) == 1:
+                    if area <= max_area:
+                        candidates.append((self.class_names[int(present[0])], (x, y, w, h), area))
+                elif len(present) > 1:
+                    # Touching chips of different classes have merged; split them where the classes meet
+                    region = np.zeros((h, w), dtype=np.uint8)
+                    cv2.drawContours(region, [contour], -1, 255, cv2.FILLED, offset=(-x, -y))
+                    for chip_type, (cx, cy, cw, ch), part in self.split_classes(region, box_labels):
+                        if min_area <= part <= max_area:
+                            candidates.append((chip_type, (x + cx, y + cy, cw, ch), part))
+        
+        return candidates
+    
+    def split_classes(self, region, labels):
+        """
+        Cut a component along the seams between its classes
+        
+        Around a seam the largest label nearby differs from the smallest
+        non-background one; those pixels are removed and each remaining part
+        takes the class most of its labelled pixels belong to.
+        
+        Args:
+            region: uint8 mask of the component within its bounding box
+            labels: Label map over the same box
+            
+        Returns:
+            list: (chip_type, bbox, area) per part, in box coordinates
+        """
+        highest = cv2.dilate(labels, self.kernel)
+        lowest = cv2.erode(cv2.LUT(labels, self.seam_table), self.kernel)
+        cv2.subtract(region, cv2.compare(highest, lowest, cv2.CMP_GT), dst=region)
+        
+        parts = []
+        contours, _ = cv2.findContours(region, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            votes = np.bincount(labels[y:y+h, x:x+w].reshape(-1), minlength=len(self.class_names) + 1)
+            if votes[1:].max() > 0:
+                parts.append((self.class_names[int(votes[1:].argmax())], (x, y, w, h), cv2.contourArea(contour)))
+        return parts
+    
+    def find_candidates_marked(self, hsv):
+        """
+        Find chips whose type shows only in coloured markings on a shared body
+        
+        Chips are the components of body_range plus every class colour. A
+        component holding markings of one class is one chip of that class.
+        When touching chips of different types have merged, each pixel of the
+        component takes the class of its nearest marking and the component is
+        split per class (chips of one type that touch still merge).
+        
+        Args:
+            hsv: HSV image
+            
+        Returns:
+            list: (chip_type, bbox, area) per candidate
+        """
+        with self.profiler.stage('masks'):
+            labels = self.classify_pixels(hsv)
+            mask = cv2.inRange(hsv, self.body_range['lower'], self.body_range['upper'])
+            cv2.bitwise_or(mask, cv2.compare(labels, 0, cv2.CMP_GT), dst=mask)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        
+        with self.profiler.stage('contours'):
+            count, components, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+            
+            # Markings of every class per component, in one histogram over (component, label) pairs
+            classes = len(self.class_names) + 1
+            marked = labels > 0
+            votes = np.bincount(components[marked] * classes + labels[marked],
+                                minlength=count * classes).reshape(count, classes)[:, 1:]
+            
+            candidates = []
+            min_area, max_area = self.area_limits()
+            for component in range(1, count):
+                x, y, w, h, area = stats[component].tolist()
+                if area < min_area:
+                    continue
+                present = (np.flatnonzero(votes[component]) + 1).tolist()
+                if len(present) == 1:
+                    if area <= max_area:
+                        candidates.append((self.class_names[present[0] - 1], (x, y, w, h), area))
+                elif len(present) > 1:
+                    region = (components[y:y+h, x:x+w] == component).astype(np.uint8)
+                    for chip_type, (cx, cy, cw, ch), part in self.split_marked(region, labels[y:y+h, x:x+w], present):
+                        if min_area <= part <= max_area:
+                            candidates.append((chip_type, (x + cx, y + cy, cw, ch), part))
+        
+        return candidates
+    
+    def split_marked(self, region, labels, present):
+        """
+        Split a component holding markings of several classes by nearest marking
+        
+        Args:
+            region: uint8 mask of the component within its bounding box
+            labels: Label map over the same box
+            present: Labels of the classes marked in the component
+            
+        Returns:
+            list: (chip_type, bbox, area) per connected part, in box coordinates
+        """
+        distances = np.stack([cv2.distanceTransform(cv2.compare(labels, label, cv2.CMP_NE), cv2.DIST_L2, 3)
+                              for label in present])
+        owner = distances.argmin(axis=0).astype(np.uint8)
+        
+        parts = []
+        for index, label in enumerate(present):
+            owned = cv2.bitwise_and(region, cv2.compare(owner, index, cv2.CMP_EQ))
+            count, components, stats, _ = cv2.connectedComponentsWithStats(owned, connectivity=8)
+            
+            # Only parts holding a marking of their class are chips
+            marked = np.bincount(components[labels == label], minlength=count) > 0
+            for component in range(1, count):
+                if marked[component]:
+                    x, y, w, h, area = stats[component].tolist()
+                    parts.append((self.class_names[label - 1], (x, y, w, h), area))
+        return parts
+    
+    def find_candidates_per_class(self, hsv):
+        """
+        Find chips with one mask per chip type
+        
+        Args:
+            hsv: HSV image
+            
+        Returns:
+            list: (chip_type, bbox, area) per candidate
+        """
+        candidates = []
+        min_area, max_area = self.area_limits()
+        
+        # Detect each chip type
+        for chip_type, color_info in self.color_ranges.items():
+            with self.profiler.stage('masks'):
+                # Create color mask
+                mask = cv2.inRange(hsv, color_info['lower'], color_info['upper'])
                 
-                # Extract ROI for digit detection
-                roi = frame[y:y+h, x:x+w]
-                digits = self.extract_digits(roi)
-                value = self.calculate_value(chip_type, digits)
-                
-                # Check if fake (random 20% chance for demo)
-                is_fake = np.random.random() < 0.2
+                # Clean up mask
+                mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+                mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+            
+            with self.profiler.stage('contours'):
+                # Find contours
+                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
                 
-                detections.append({
-                    'chip_type': chip_type,
-                    'bbox': (x, y, w, h),
-                    'centroid': (x + w//2, y + h//2),
-                    'area': area,
-                    'digits': digits,
-                    'value': value if not is_fake else 0,
-                    'is_fake': is_fake,
-                    'color': color_info['bgr_color']
-                })
+                for contour in contours:
+                    area = cv2.contourArea(contour)
+                    
+                    # Filter by area
+                    if area < min_area or area > max_area:
+                        continue
+                    
+                    # Get bounding box
+                    candidates.append((chip_type, cv2.boundingRect(contour), area))
         
-        return detections
+        return candidates
     
     def extract_digits(self, roi):
         """
@@ -163,21 +587,35 @@ class ChipDetector:
         Returns:
             tuple: (d1, d2, d3)
         """
-        # Simple random digits for now (can be replaced with OCR)
-        # In production, use pytesseract or deep learning model
-        return (np.random.randint(1, 10), np.random.randint(0, 10), np.random.randint(0, 10))
+        return self.digit_reader.read(roi)[0]
     
-    def calculate_value(self, chip_type, digits):
+    def extract_digits_batch(self, rois):
+        """
+        Read the digits of every chip ROI of a frame in one pass
+        
+        Args:
+            rois: List of chip regions of interest
+            
+        Returns:
+            list: ((d1, d2, d3), (c1, c2, c3)) digits and confidences per ROI
+        """
+        return self.digit_reader.read_batch(rois)
+    
+    def calculate_value(self, chip_type, digits, confidences=None):
         """
         Calculate chip value based on type and digits
         
         Args:
             chip_type: 'GOLD', 'SILVER', or 'BRONZE'
             digits: Tuple of (d1, d2, d3)
+            confidences: Optional per-digit read confidences
             
         Returns:
-            int: Chip value
+            int: Chip value, or None when a digit is below min_digit_confidence
         """
+        if confidences is not None and min(confidences) < self.min_digit_confidence:
+            return None
+        
         d1, d2, d3 = digits
         
         if chip_type == 'GOLD':
@@ -193,16 +631,328 @@ class ChipDetector:
         return 0
 
 
+class ChipTracker:
+    """Follow chips across frames, classify each once and commit it once at the scan line"""
+    
+    def __init__(self, detector, max_disappeared=15, max_distance=80, max_reads=3, settle_reads=2):
+        """
+        Initialize tracker
+        
+        Args:
+            detector: ChipDetector used to classify new tracks
+            max_disappeared: Frames a track survives without a matching detection
+            max_distance: Largest centroid jump (px) still matched to a track
+            max_reads: Most classifications run for one chip
+            settle_reads: Identical consecutive readable reads that settle a chip early
+        """
+        self.detector = detector
+        self.max_disappeared = max_disappeared
+        self.max_distance = max_distance
+        self.max_reads = max_reads
+        self.settle_reads = settle_reads
+        
+        self.tracks = {}
+        self.next_id = 0
+        self.classifications = 0
+    
+    def update(self, frame, detections):
+        """
+        Match this frame's detections to tracks and classify unsettled tracks
+        
+        Args:
+            frame: BGR image the detections came from
+            detections: ChipDetector.detect_chips(frame, classify=False) output
+            
+        Returns:
+            list: Tracks that crossed the scan line this frame, each committed once
+        """
+        scan_y = frame.shape[0] // 2
+        regions = self.detector.scan_regions(frame.shape[0])
+        matches = self.match(detections)
+        
+        # Age out tracks that found no detection
+        matched_ids = set(matches.values())
+        for track_id in list(self.tracks):
+            if track_id not in matched_ids:
+                track = self.tracks[track_id]
+                track['disappeared'] += 1
+                if track['disappeared'] > self.max_disappeared:
+                    del self.tracks[track_id]
+        
+        crossed = []
+        unsettled = []
+        for i, det in enumerate(detections):
+            track = self.tracks.get(matches.get(i))
+            if track is None:
+                track = self.create_track(det)
+            
+            previous_y = track['centroid'][1]
+            track.update(bbox=det['bbox'], centroid=det['centroid'], zone=det['zone'], disappeared=0)
+            track['type_votes'][det['chip_type']] = track['type_votes'].get(det['chip_type'], 0) + 1
+            track['chip_type'] = max(track['type_votes'], key=track['type_votes'].get)
+            track['color'] = self.detector.color_ranges[track['chip_type']]['bgr_color']
+            
+            # Chips are read on the scan line, wholly in view, so every scan band reads the same crops
+            _, y, _, h = det['bbox']
+            if not track['settled'] and y < scan_y < y + h and self.in_view(det['bbox'], regions, frame.shape[1]):
+                unsettled.append(track)
+            
+            # Commit on crossing the scan line, in either belt direction
+            crossing = (previous_y < scan_y) != (det['centroid'][1] < scan_y)
+            if crossing and not track['committed']:
+                crossed.append(track)
+        
+        # All unsettled chips of the frame are read in one batch
+        self.read_tracks(frame, unsettled)
+        
+        # Chips reaching the scan line are settled now so they commit with a final read
+        pending = [t for t in crossed if not t['settled']]
+        while pending:
+            self.read_tracks(frame, pending)
+            pending = [t for t in pending if not t['settled']]
+        for track in crossed:
+            track['committed'] = True
+        
+        return crossed
+    
+    @staticmethod
+    def in_view(bbox, regions, width):
+        """
+        Whether a box lies wholly inside one processed region, clear of its edges
+        
+        Args:
+            bbox: (x, y, w, h) box
+            regions: ChipDetector.scan_regions() output
+            width: Frame width
+        """
+        x, y, w, h = bbox
+        if x <= 0 or x + w >= width:
+            return False
+        return any(y0 < y and y + h < y1 for _, y0, y1 in regions)
+    
+    def match(self, detections):
+        """
+        Greedily pair detections with the nearest live tracks
+        
+        Returns:
+            dict: Detection index -> track ID
+        """
+        if not detections or not self.tracks:
+            return {}
+        
+        track_ids = list(self.tracks)
+        track_centroids = np.array([self.tracks[t]['centroid'] for t in track_ids], dtype=np.float32)
+        det_centroids = np.array([d['centroid'] for d in detections], dtype=np.float32)
+        distances = np.linalg.norm(det_centroids[:, None, :] - track_centroids[None, :, :], axis=2)
+        
+        matches = {}
+        used_tracks = set()
+        for flat in np.argsort(distances, axis=None):
+            det_index, track_index = np.unravel_index(flat, distances.shape)
+            if distances[det_index, track_index] > self.max_distance:
+                break
+            if det_index in matches or track_index in used_tracks:
+                continue
+            matches[int(det_index)] = track_ids[track_index]
+            used_tracks.add(track_index)
+        return matches
+    
+    def create_track(self, detection):
+        """Register a new chip"""
+        track = {
+            'id': self.next_id,
+            'chip_type': detection['chip_type'],
+            'bbox': detection['bbox'],
+            'centroid': detection['centroid'],
+            'color': detection['color'],
+            'zone': detection['zone'],
+            'disappeared': 0,
+            'type_votes': {},
+            'reads': [],
+            'attempts': 0,
+            'settled': False,
+            'committed': False,
+            'digits': None,
+            'readable': False,
+            'value': 0,
+            'is_fake': False
+        }
+        self.tracks[self.next_id] = track
+        self.next_id += 1
+        return track
+    
+    def read_tracks(self, frame, tracks):
+        """Classify tracks once more and settle each when its reads agree or run out"""
+        if not tracks:
+            return
+        
+        for track, read in zip(tracks, self.detector.classify_chips(frame, tracks)):
+            self.classifications += 1
+            track['attempts'] += 1
+            if read['readable']:
+                track['reads'].append((read['digits'], read['is_fake']))
+            
+            recent = track['reads'][-self.settle_reads:]
+            agreed = len(recent) == self.settle_reads and len(set(recent)) == 1
+            if agreed or track['attempts'] >= self.max_reads:
+                track['settled'] = True
+            
+            if not track['reads']:
+                track.update(is_fake=read['is_fake'], readable=False, value=0)
+                continue
+            
+            # Majority vote over the readable reads so far
+            digits, is_fake = max(set(track['reads']), key=track['reads'].count)
+            value = self.detector.calculate_value(track['chip_type'], digits)
+            track.update(digits=digits, is_fake=is_fake, readable=True, value=0 if is_fake else value)
+    
+    def visible_tracks(self):
+        """Tracks matched to a detection in the latest frame"""
+        return [t for t in self.tracks.values() if t['disappeared'] == 0]
+
+
+class FrameGrabber:
+    """Capture thread that keeps a bounded ring of the most recent camera frames"""
+    
+    def __init__(self, camera, queue_size=2, policy='latest'):
+        """
+        Initialize frame grabber
+        
+        Args:
+            camera: Object with read_frame() -> (success, frame)
+            queue_size: Maximum frames buffered between capture and processing
+            policy: 'latest' hands out the newest frame and discards the backlog,
+                    'drop_oldest' hands frames out in order, evicting the oldest when full
+        """
+        if policy not in ('latest', 'drop_oldest'):
+            raise ValueError(f"Unknown frame drop policy: {policy}")
+        
+        self.camera = camera
+        self.policy = policy
+        self.frames = deque(maxlen=max(1, queue_size))
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        
+        # Counters
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+    
+    def start(self):
+        """Start the capture thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, name="FrameGrabber", daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self, timeout=2.0):
+        """
+        Stop the capture thread and wait until it has exited
+        
+        The thread may be blocked in a camera read, so the wait is retried
+        until it returns; releasing the camera under a running read crashes
+        some drivers.
+        
+        Args:
+            timeout: Seconds between progress messages while waiting
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            while self.thread.is_alive():
+                print("⏳ Waiting for the camera read to return...")
+                self.thread.join(timeout)
+            self.thread = None
+    
+    def _capture_loop(self):
+        """Read frames from the camera as fast as it delivers them"""
+        while self.running:
+            success, frame = self.camera.read_frame()
+            with self.condition:
+                if not success or frame is None:
+                    self.failed += 1
+                    self.running = False
+                    self.condition.notify_all()
+                    break
+                
+                self.captured += 1
+                if len(self.frames) == self.frames.maxlen:
+                    self.dropped += 1  # deque evicts the oldest frame
+                self.frames.append(frame)
+                self.condition.notify()
+    
+    def read_frame(self, timeout=2.0):
+        """
+        Get the next frame for processing
+        
+        Args:
+            timeout: Seconds to wait for a frame
+            
+        Returns:
+            tuple: (success, frame)
+        """
+        with self.condition:
+            if not self.frames and self.running:
+                self.condition.wait(timeout)
+            if not self.frames:
+                return False, None
+            
+            if self.policy == 'latest':
+                frame = self.frames.pop()
+                self.dropped += len(self.frames)
+                self.frames.clear()
+            else:
+                frame = self.frames.popleft()
+            
+            self.delivered += 1
+            return True, frame
+    
+    def stats(self):
+        """Return capture counters"""
+        with self.condition:
+            return {
+                'captured': self.captured,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'queued': len(self.frames)
+            }
+
+
 class CameraChipSystem:
     """Main camera-based chip detection system"""
     
-    def __init__(self, camera_type="WEBCAM", webcam_index=0):
+    def __init__(self, camera_type="WEBCAM", webcam_index=0, threaded_capture=True,
+                 queue_size=2, drop_policy='latest', detection_scale=1.0,
+                 scan_band=None, edge_strip=0, ledger_dir='ledger', camera=None,
+                 color_ranges=None, authenticator=None, digit_reader=None, profile=False,
+                 profile_path=None):
         """
         Initialize system
         
+        Shared state can be injected (see launcher.WarmRuntime); anything
+        injected is used as is and left open when the system shuts down.
+        
         Args:
             camera_type: "BASLER" or "WEBCAM"
             webcam_index: Camera index for webcam
+            threaded_capture: Capture frames on a background thread
+            queue_size: Frames buffered between capture and processing
+            drop_policy: 'latest' or 'drop_oldest' (see FrameGrabber)
+            detection_scale: Pyramid level for finding chips (see ChipDetector)
+            scan_band: Only process this many rows around the scan line
+            edge_strip: Early-warning strip height at the belt edges
+            ledger_dir: Directory committed chips are streamed to (None keeps totals in memory only)
+            camera: Open camera handle to use instead of connecting
+            color_ranges: Calibrated color ranges, skipping calibration
+            authenticator: ReferenceAuthenticator, instead of loading one from assets/
+            digit_reader: DigitReader, instead of building the glyph bank
+            profile: Start with per-stage timing on (toggle with I)
+            profile_path: JSON file the stage timings are written to on exit
         """
         print("\n" + "="*60)
         print("🎬 INTERGALACTIC RIKSBANKEN CHIP AUTHENTICATOR")
@@ -210,41 +960,62 @@ class CameraChipSystem:
         print("="*60)
         
         # Initialize camera
-        if CAMERA_AVAILABLE:
-            print(f"[1/4] Connecting to {camera_type}...")
-            self.camera = CameraManager(
-                camera_type=camera_type,
-                webcam_index=webcam_index,
-                width=1280,
-                height=720,
-                fps=30
-            )
+        self.owns_camera = camera is None
+        if camera is not None:
+            print("[1/4] Using connected camera")
+            self.camera = camera
         else:
-            print("[1/4] Camera unavailable - using demo mode")
-            self.camera = None
+            self.camera = open_camera(camera_type, webcam_index)
         
-        # Calibrate chip colors
-        print("[2/4] Calibrating chip colors...")
-        color_ranges = None
-        if self.camera:
-            color_ranges = self.calibrate_colors()
+        # Calibrate chip colors; a virtual camera knows the simulator's colors
+        if color_ranges is None and getattr(self.camera, 'color_ranges', None):
+            print("[2/4] Using the virtual camera's chip colors")
+            color_ranges = self.camera.color_ranges
+        elif color_ranges is not None:
+            print("[2/4] Using calibrated chip colors")
+        else:
+            print("[2/4] Calibrating chip colors...")
+            if self.camera:
+                color_ranges = self.calibrate_colors()
         
         # Initialize detector
         print("[3/4] Initializing chip detector...")
-        self.detector = ChipDetector(color_ranges=color_ranges)
+        if authenticator is None:
+            authenticator = getattr(self.camera, 'authenticator', None) or ReferenceAuthenticator.from_assets()
+        if authenticator.descriptors:
+            print(f"   Reference descriptors: {', '.join(authenticator.descriptors)}")
+        else:
+            print("   ⚠️  No reference templates - fake check runs in demo mode")
+            authenticator = None
+        self.detector = ChipDetector(color_ranges=color_ranges, detection_scale=detection_scale,
+                                     scan_band=scan_band, edge_strip=edge_strip,
+                                     authenticator=authenticator, digit_reader=digit_reader,
+                                     body_range=getattr(self.camera, 'body_range', None))
+        if getattr(self.camera, 'min_chip_area', None):
+            self.detector.min_area = self.camera.min_chip_area
         
         # Initialize tracker
         print("[4/4] Initializing tracking system...")
-        if CAMERA_AVAILABLE:
-            self.tracker = CentroidTracker(maxDisappeared=30, maxDistance=50)
-        else:
-            self.tracker = None
+        self.tracker = ChipTracker(self.detector)
         
         # Stats
-        self.total_value = 0
-        self.real_count = 0
-        self.fake_count = 0
-        self.fps_queue = deque(maxlen=30)
+        self.ledger = SessionLedger('camera', ledger_dir)
+        self.frame_times = deque(maxlen=30)
+        self.pacer = FramePacer(target_fps=30)
+        
+        # Per-stage timing, shared with the detector; free while switched off
+        self.profiler = StageProfiler(enabled=profile)
+        self.profile_path = profile_path
+        self.detector.profiler = self.profiler
+        
+        # Glass-to-glass latency, for sources that stamp frame markers (simulator --markers)
+        self.latency = LatencyMonitor()
+        
+        # Capture stage
+        self.threaded_capture = threaded_capture
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.grabber = None
         
         print("\n✅ System ready!")
         print("="*60)
@@ -252,6 +1023,7 @@ class CameraChipSystem:
         print("  Q - Quit")
         print("  R - Reset statistics")
         print("  SPACE - Pause/Resume")
+        print("  I - Toggle stage timings")
         print("="*60 + "\n")
     
     def calibrate_colors(self):
@@ -335,9 +1107,19 @@ class CameraChipSystem:
         return color_ranges
     
     def draw_detections(self, frame, detections):
-        """Draw detections on frame"""
+        """Draw detections (or tracks) on frame"""
         output = frame.copy()
         
+        # Scan line where chips are counted
+        scan_y = output.shape[0] // 2
+        cv2.line(output, (0, scan_y), (output.shape[1], scan_y), (0, 255, 255), 1)
+        
+        # Outline the processed regions when not scanning the whole frame
+        if self.detector.scan_band is not None:
+            for zone, y_start, y_end in self.detector.scan_regions(output.shape[0]):
+                zone_color = (255, 255, 0) if zone == 'scan' else (0, 165, 255)
+                cv2.rectangle(output, (0, y_start), (output.shape[1] - 1, y_end - 1), zone_color, 1)
+        
         for det in detections:
             x, y, w, h = det['bbox']
             chip_type = det['chip_type']
@@ -354,6 +1136,8 @@ class CameraChipSystem:
             
             # Draw chip type
             label = f"{chip_type}"
+            if 'id' in det:
+                label = f"#{det['id']} {label}"
             if is_fake:
                 label += " [FAKE]"
             
@@ -361,7 +1145,7 @@ class CameraChipSystem:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, draw_color, 2)
             
             # Draw digits
-            digit_str = f"{digits[0]}{digits[1]}{digits[2]}"
+            digit_str = "???" if digits is None else f"{digits[0]}{digits[1]}{digits[2]}"
             cv2.putText(output, digit_str, (x, y-5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, draw_color, 1)
             
@@ -376,110 +1160,182 @@ class CameraChipSystem:
         """Draw statistics panel"""
         h, w = frame.shape[:2]
         
+        latency = self.latency.hud_text()
+        
         # Create semi-transparent overlay
         overlay = frame.copy()
-        cv2.rectangle(overlay, (10, 10), (350, 150), (0, 0, 0), -1)
+        cv2.rectangle(overlay, (10, 10), (350, 175 if latency else 150), (0, 0, 0), -1)
         frame = cv2.addWeighted(overlay, 0.7, frame, 0.3, 0)
         
         # Draw text
         y_offset = 40
-        cv2.putText(frame, f"Total Value: {self.total_value} CR", (20, y_offset),
+        cv2.putText(frame, f"Total Value: {self.ledger.total_value} CR", (20, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
         y_offset += 30
-        cv2.putText(frame, f"Real Chips: {self.real_count}", (20, y_offset),
+        cv2.putText(frame, f"Real Chips: {self.ledger.real_count}", (20, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 200, 0), 2)
         
         y_offset += 30
-        cv2.putText(frame, f"Fake Chips: {self.fake_count}", (20, y_offset),
+        cv2.putText(frame, f"Fake Chips: {self.ledger.fake_count}", (20, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
         
-        # FPS
-        if self.fps_queue:
-            fps = sum(self.fps_queue) / len(self.fps_queue)
+        # FPS over the whole loop, including the pacer's wait
+        if self.frame_times:
+            fps = len(self.frame_times) / sum(self.frame_times)
             y_offset += 30
             cv2.putText(frame, f"FPS: {fps:.1f}", (20, y_offset),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
         
+        # Capture drops
+        if self.grabber:
+            stats = self.grabber.stats()
+            cv2.putText(frame, f"Dropped: {stats['dropped']}/{stats['captured']}", (200, y_offset),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        
+        # Marker latency
+        if latency:
+            cv2.putText(frame, latency, (20, 160), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        
+        # Stage timings
+        if self.profiler.enabled:
+            self.profiler.draw(frame, w - 310, 10)
+        
         return frame
     
+    def process_frame(self, frame):
+        """
+        Detect, track and count the chips in one frame
+        
+        Args:
+            frame: BGR image
+            
+        Returns:
+            tuple: (frame with detections drawn, tracks that crossed the scan line)
+        """
+        # Locate chips; each chip is classified once by its track
+        # (the detector and tracker time their own stages)
+        detections = self.detector.detect_chips(frame, classify=False)
+        crossed = self.tracker.update(frame, detections)
+        
+        # Count each chip once, as it crosses the scan line
+        for track in crossed:
+            self.ledger.commit({'id': track['id'], 'type': track['chip_type'],
+                                'digits': track['digits'], 'value': track['value'],
+                                'authentic': not track['is_fake'], 'readable': track['readable']})
+        
+        # Draw detections
+        with self.profiler.stage('draw'):
+            frame = self.draw_detections(frame, self.tracker.visible_tracks())
+        return frame, crossed
+    
     def run(self):
         """Main processing loop"""
         paused = False
         
         print("🎥 Starting camera feed...\n")
         
+        source = self.camera
+        if self.threaded_capture:
+            self.grabber = FrameGrabber(self.camera, queue_size=self.queue_size,
+                                        policy=self.drop_policy).start()
+            source = self.grabber
+        
+        profiler = self.profiler
+        last_frame = time.perf_counter()
+        
         while True:
-            frame_start = time.time()
-            
             # Capture frame
-            if self.camera:
-                success, frame = self.camera.read_frame()
-                if not success or frame is None:
-                    print("❌ Failed to capture frame")
-                    break
-            else:
-                # Demo mode - create blank frame
-                frame = np.zeros((720, 1280, 3), dtype=np.uint8)
-                cv2.putText(frame, "DEMO MODE - Camera not available", (300, 360),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
-            
-            if not paused and self.camera:
-                # Detect chips
-                detections = self.detector.detect_chips(frame)
-                
-                # Update statistics
-                for det in detections:
-                    if det['is_fake']:
-                        self.fake_count += 1
-                    else:
-                        self.real_count += 1
-                        self.total_value += det['value']
-                
-                # Draw detections
-                frame = self.draw_detections(frame, detections)
+            with profiler.stage('capture'):
+                success, frame = source.read_frame()
+            if not success or frame is None:
+                print("❌ Failed to capture frame")
+                break
+            self.latency.observe(frame)
+            
+            crossed = []
+            if not paused:
+                frame, crossed = self.process_frame(frame)
             
             # Draw stats
-            frame = self.draw_stats(frame)
+            with profiler.stage('draw'):
+                frame = self.draw_stats(frame)
             
             # Show frame
-            cv2.imshow("Intergalactic Riksbanken Chip Authenticator", frame)
+            with profiler.stage('display'):
+                cv2.imshow("Intergalactic Riksbanken Chip Authenticator", frame)
+            self.latency.shown(committed=bool(crossed))
             
-            # Calculate FPS
-            frame_time = time.time() - frame_start
-            if frame_time > 0:
-                self.fps_queue.append(1.0 / frame_time)
+            # Handle keys (waits out the rest of the frame)
+            with profiler.stage('wait'):
+                key = self.pacer.wait_key(changed=not paused)
+            profiler.end_frame()
             
-            # Handle keys
-            key = cv2.waitKey(1) & 0xFF
+            now = time.perf_counter()
+            self.frame_times.append(now - last_frame)
+            last_frame = now
             
             if key == ord('q'):
                 print("\n👋 Shutting down...")
                 break
             elif key == ord('r'):
                 print("🔄 Resetting statistics...")
-                self.total_value = 0
-                self.real_count = 0
-                self.fake_count = 0
+                self.ledger.reset()
+                self.latency.reset()
             elif key == ord(' '):
                 paused = not paused
                 print(f"{'⏸️  Paused' if paused else '▶️  Resumed'}")
+            elif key == ord('i'):
+                print(f"⏱️  Stage timings {'on' if profiler.toggle() else 'off'}")
         
-        # Cleanup
-        if self.camera:
+        # Cleanup; the camera is released only once the capture thread has exited
+        if self.grabber:
+            self.grabber.stop()
+        if self.owns_camera:
             self.camera.release()
         cv2.destroyAllWindows()
+        self.ledger.close()
         
         print(f"\n📊 Final Statistics:")
-        print(f"   Total Value: {self.total_value} CR")
-        print(f"   Real Chips: {self.real_count}")
-        print(f"   Fake Chips: {self.fake_count}")
+        print(f"   Total Value: {self.ledger.total_value} CR")
+        print(f"   Real Chips: {self.ledger.real_count}")
+        print(f"   Fake Chips: {self.ledger.fake_count}")
+        print(f"   Unreadable Chips: {self.ledger.unreadable_count}")
+        self.ledger.print_summary()
+        print(f"   Classifications: {self.tracker.classifications} for {self.tracker.next_id} tracked chips")
+        self.pacer.print_stats()
+        if self.grabber:
+            stats = self.grabber.stats()
+            print(f"   Frames: {stats['captured']} captured | {stats['delivered']} processed | "
+                  f"{stats['dropped']} dropped ({self.drop_policy})")
+        self.latency.print_stats(self.grabber.stats()['dropped'] if self.grabber else None)
+        profiler.dump(self.profile_path)
         print("\n✅ System shutdown complete\n")
 
 
-def main():
-    """Main entry point"""
-    # Ask user for camera type
+def open_camera(camera_type="WEBCAM", webcam_index=0):
+    """
+    Connect to a camera
+    
+    Returns:
+        CameraManager, or a simulator-backed VirtualCamera when camera support is unavailable
+    """
+    if not CAMERA_AVAILABLE:
+        print("[1/4] Camera unavailable - using the virtual camera (conveyor simulator)")
+        from virtual_camera import VirtualCamera
+        return VirtualCamera()
+    print(f"[1/4] Connecting to {camera_type}...")
+    return CameraManager(
+        camera_type=camera_type,
+        webcam_index=webcam_index,
+        width=1280,
+        height=720,
+        fps=30
+    )
+
+
+def choose_camera_type():
+    """Ask the user for the camera type"""
     print("\n" + "="*60)
     print("CAMERA SELECTION")
     print("="*60)
@@ -490,12 +1346,23 @@ def main():
     choice = input("\nSelect camera type (1/2) [1]: ").strip()
     
     if choice == "2":
-        camera_type = "BASLER"
-    else:
-        camera_type = "WEBCAM"
+        return "BASLER"
+    return "WEBCAM"
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Camera chip authenticator")
+    parser.add_argument('--profile', action='store_true', help="Time each loop stage (p50/p95/p99 on the HUD and at exit)")
+    parser.add_argument('--profile-out', metavar='PATH', help="Write the stage timings to a JSON file on exit")
+    args = parser.parse_args()
     
     # Initialize and run system
-    system = CameraChipSystem(camera_type=camera_type, webcam_index=0)
+    system = CameraChipSystem(camera_type=choose_camera_type(), webcam_index=0,
+                              profile=args.profile or args.profile_out is not None,
+                              profile_path=args.profile_out)
     system.run()
 
 
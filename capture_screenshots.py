@@ -37,15 +37,13 @@ def capture_screenshots():
     print("2. Capturing with multiple chips...")
     sim.chips.clear()
     # Manually spawn multiple chips at different positions
-    for i in range(6):
-        sim.spawn_chip()
+    sim.spawn_chips(6)
     
     # Position them nicely along the conveyor
     positions = [(320, 100), (450, 200), (600, 150), (380, 350), (700, 280), (520, 450)]
     for i, pos in enumerate(positions):
         if i < len(sim.chips):
-            sim.chips[i]['x'] = pos[0]
-            sim.chips[i]['y'] = pos[1]
+            sim.chips.update(i, x=pos[0], y=pos[1])
     
     frame = sim.render_frame()
     screenshots.append(("02_multiple_chips.png", frame.copy()))
@@ -55,10 +53,7 @@ def capture_screenshots():
     print("3. Capturing Gold chip...")
     sim.chips.clear()
     sim.spawn_chip()
-    sim.chips[0]['type'] = 'GOLD'
-    sim.chips[0]['chip_type'] = 'GOLD'
-    sim.chips[0]['x'] = 400
-    sim.chips[0]['y'] = 250
+    sim.chips.update(0, type='GOLD', x=400, y=250)
     frame = sim.render_frame()
     screenshots.append(("03_gold_chip.png", frame.copy()))
     print("   ✓ Gold chip captured")
@@ -66,10 +61,7 @@ def capture_screenshots():
     print("4. Capturing Silver chip...")
     sim.chips.clear()
     sim.spawn_chip()
-    sim.chips[0]['type'] = 'SILVER'
-    sim.chips[0]['chip_type'] = 'SILVER'
-    sim.chips[0]['x'] = 500
-    sim.chips[0]['y'] = 280
+    sim.chips.update(0, type='SILVER', x=500, y=280)
     frame = sim.render_frame()
     screenshots.append(("04_silver_chip.png", frame.copy()))
     print("   ✓ Silver chip captured")
@@ -77,10 +69,7 @@ def capture_screenshots():
     print("5. Capturing Bronze chip...")
     sim.chips.clear()
     sim.spawn_chip()
-    sim.chips[0]['type'] = 'BRONZE'
-    sim.chips[0]['chip_type'] = 'BRONZE'
-    sim.chips[0]['x'] = 600
-    sim.chips[0]['y'] = 320
+    sim.chips.update(0, type='BRONZE', x=600, y=320)
     frame = sim.render_frame()
     screenshots.append(("05_bronze_chip.png", frame.copy()))
     print("   ✓ Bronze chip captured")
@@ -88,10 +77,7 @@ def capture_screenshots():
     print("6. Capturing fake chip...")
     sim.chips.clear()
     sim.spawn_chip()
-    sim.chips[0]['authentic'] = False
-    sim.chips[0]['value'] = 0
-    sim.chips[0]['x'] = 450
-    sim.chips[0]['y'] = 300
+    sim.chips.update(0, authentic=False, value=0, x=450, y=300)
     frame = sim.render_frame()
     screenshots.append(("06_fake_chip.png", frame.copy()))
     print("   ✓ Fake chip captured")
@@ -99,15 +85,13 @@ def capture_screenshots():
     # Screenshot: Full simulation
     print("7. Creating full simulation scene...")
     sim.chips.clear()
-    for _ in range(5):
-        sim.spawn_chip()
+    sim.spawn_chips(5)
     
     # Spread them out nicely
     positions = [(300, 150), (500, 300), (650, 450), (400, 550), (750, 200)]
     for i, pos in enumerate(positions):
         if i < len(sim.chips):
-            sim.chips[i]['x'] = pos[0]
-            sim.chips[i]['y'] = pos[1]
+            sim.chips.update(i, x=pos[0], y=pos[1])
     
     frame = sim.render_frame()
     screenshots.append(("07_full_simulation.png", frame.copy()))
@@ -0,0 +1,181 @@
+"""
+Chip Store
+Structure-of-arrays storage for the chips on the simulator belt
+"""
+
+import numpy as np
+
+from templates import CHIP_TYPES
+
+
+class ChipView:
+    """Read-only dict-like view of one chip in a ChipStore, valid until the store next changes"""
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.store.get_field(self.index, key)
+
+    def __setitem__(self, key, value):
+        raise TypeError("Chip views are read-only; use ChipStore.update()")
+
+    def __contains__(self, key):
+        return key in ChipStore.FIELDS
+
+    def get(self, key, default=None):
+        """Field value, or default for unknown fields"""
+        return self[key] if key in self else default
+
+    def as_dict(self):
+        """Copy of the chip as a plain dict"""
+        return {key: self[key] for key in ChipStore.FIELDS}
+
+
+class ChipStore:
+    """Chips held column-wise in NumPy arrays so belt updates are vectorised"""
+
+    FIELDS = ('id', 'type', 'x', 'y', 'width', 'height', 'template', 'sprite',
+              'value', 'authentic', 'velocity_y', 'counted', 'difference')
+
+    def __init__(self, capacity=64):
+        """
+        Initialize empty store
+
+        Args:
+            capacity: Initial column length (grows by doubling)
+        """
+        self.count = 0
+        self.columns = {
+            'id': np.zeros(capacity, dtype=np.int64),
+            'type': np.zeros(capacity, dtype=np.int8),
+            'x': np.zeros(capacity, dtype=np.float32),
+            'y': np.zeros(capacity, dtype=np.float32),
+            'width': np.zeros(capacity, dtype=np.int32),
+            'height': np.zeros(capacity, dtype=np.int32),
+            'look': np.zeros(capacity, dtype=np.int32),
+            'value': np.zeros(capacity, dtype=np.int32),
+            'authentic': np.zeros(capacity, dtype=bool),
+            'velocity_y': np.zeros(capacity, dtype=np.float32),
+            'counted': np.zeros(capacity, dtype=bool),
+            'difference': np.zeros(capacity, dtype=np.float32)
+        }
+
+        # Shared (template, sprite) pairs; chips store an index into this list
+        self.looks = []
+        self.look_index = {}
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (ChipView(self, i) for i in range(self.count))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("chip index out of range")
+        return ChipView(self, index)
+
+    def column(self, name):
+        """Live view of one column for the chips in the store"""
+        return self.columns[name][:self.count]
+
+    def get_field(self, index, key):
+        """Value of one field of one chip"""
+        if key == 'type':
+            return CHIP_TYPES[self.columns['type'][index]]
+        if key in ('template', 'sprite'):
+            template, sprite = self.looks[self.columns['look'][index]]
+            return template if key == 'template' else sprite
+        value = self.columns[key][index]
+        return value.item()
+
+    def add(self, chip_type, x, y, template, sprite, value, authentic, velocity_y, difference, chip_id):
+        """
+        Append a chip
+
+        Returns:
+            ChipView: View of the new chip
+        """
+        if self.count == len(self.columns['id']):
+            self.grow()
+
+        i = self.count
+        row = {'id': chip_id, 'type': CHIP_TYPES.index(chip_type), 'x': x, 'y': y,
+               'width': template.shape[1], 'height': template.shape[0], 'look': self.register_look(template, sprite),
+               'value': value, 'authentic': authentic, 'velocity_y': velocity_y,
+               'counted': False, 'difference': difference}
+        for name, column in self.columns.items():
+            column[i] = row[name]
+        self.count += 1
+        return ChipView(self, i)
+
+    def register_look(self, template, sprite):
+        """Index of a shared (template, sprite) pair, registering it on first use"""
+        key = id(sprite)
+        if key not in self.look_index:
+            self.look_index[key] = len(self.looks)
+            self.looks.append((template, sprite))
+        return self.look_index[key]
+
+    def update(self, index, **fields):
+        """Set fields of one chip (e.g. position for staged screenshots)"""
+        for key, value in fields.items():
+            if key == 'type':
+                value = CHIP_TYPES.index(value)
+            elif key not in self.columns:
+                raise KeyError(f"Chip field {key} cannot be set")
+            self.columns[key][index] = value
+
+    def grow(self):
+        """Double the capacity of every column"""
+        for name, column in self.columns.items():
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+
+    def clear(self):
+        """Remove every chip"""
+        self.count = 0
+        self.looks = []
+        self.look_index = {}
+
+    def advance(self):
+        """Move every chip by its velocity"""
+        self.column('y')[:] += self.column('velocity_y')
+
+    def mark_crossed(self, line_y):
+        """
+        Flag chips that have passed line_y for the first time
+
+        Returns:
+            np.ndarray: Indices of the chips that crossed this call
+        """
+        crossed = np.flatnonzero((self.column('y') > line_y) & ~self.column('counted'))
+        self.column('counted')[crossed] = True
+        return crossed
+
+    def remove_beyond(self, limit_y):
+        """Drop chips whose y is past limit_y, keeping the order of the rest"""
+        keep = self.column('y') <= limit_y
+        if keep.all():
+            return
+        kept = int(keep.sum())
+        for name, column in self.columns.items():
+            column[:kept] = column[:self.count][keep]
+        self.count = kept
+
+    def visible(self, height):
+        """Indices of chips overlapping rows 0..height"""
+        y = self.column('y')
+        return np.flatnonzero((y + self.column('height') > 0) & (y < height))
+
+    def sprites(self, indices):
+        """Shared sprite of each chip in indices"""
+        looks = self.looks
+        return [looks[k][1] for k in self.column('look')[indices].tolist()]
@@ -9,31 +9,44 @@ import time
 import random
 from collections import deque
 
+from sprites import Sprite
+from ledger import SessionLedger
+from templates import load_chip_assets, asset_path, CHIP_TYPES
+from pacing import FramePacer
+
 
 class ChipGame:
     """Interactive game for manual chip testing"""
     
-    def __init__(self, width=1280, height=720):
-        """Initialize game"""
+    def __init__(self, width=1280, height=720, ledger_dir='ledger', assets=None):
+        """
+        Initialize game
+        
+        Args:
+            ledger_dir: Directory spawned chips are streamed to (None keeps totals in memory only)
+            assets: Preloaded load_chip_assets() output (loaded here when None)
+        """
         self.width = width
         self.height = height
         
         # Load chip templates
         self.templates = {}
-        self.load_chip_templates()
+        self.sprites = {}
+        self.load_chip_templates(assets)
         
         # Game state
         self.chips = []
+        self.scene = None  # Grid and chips with labels; rebuilt only when chips are removed
+        self.scene_chips = 0  # Chips already drawn into the scene
         self.next_chip_id = 0
         self.paused = False
         
         # Statistics
-        self.total_value = 0
-        self.real_count = 0
-        self.fake_count = 0
+        self.ledger = SessionLedger('game', ledger_dir)
         
-        # FPS
-        self.fps_queue = deque(maxlen=30)
+        # FPS; the static scene drops to the pacer's idle rate until a key is pressed
+        self.frame_times = deque(maxlen=30)
+        self.pacer = FramePacer(target_fps=30)
         
         print("\n🎮 INTERGALACTIC RIKSBANKEN CHIP AUTHENTICATOR")
         print("         Interactive Game Mode")
@@ -42,48 +55,27 @@ class ChipGame:
         print("  1 - Spawn GOLD chip")
         print("  2 - Spawn SILVER chip")
         print("  3 - Spawn BRONZE chip")
+        print("  U - Remove last chip")
         print("  C - Clear all chips")
         print("  P - Pause/Resume")
         print("  R - Reset statistics")
         print("  Q - Quit")
         print("="*60 + "\n")
     
-    def load_chip_templates(self):
+    def load_chip_templates(self, assets=None):
         """Load chip template images"""
-        chip_types = ['GOLD', 'SILVER', 'BRONZE']
+        if assets is None:
+            assets = load_chip_assets()
         
-        for chip_type in chip_types:
-            filename = f"assets/{chip_type.lower()}.png"
-            img = cv2.imread(filename, cv2.IMREAD_UNCHANGED)
-            
-            if img is None:
-                print(f"⚠️  Warning: Could not load {filename}")
-                # Create placeholder
-                img = np.ones((100, 200, 4), dtype=np.uint8) * 255
-            
-            # Remove green background
-            if img.shape[2] == 4:
-                rgb_img = img[:, :, :3]
+        for chip_type in CHIP_TYPES:
+            if chip_type in assets:
+                rgba = assets[chip_type]['template']
+                self.sprites[chip_type] = assets[chip_type]['sprite']
             else:
-                rgb_img = img
-            
-            hsv = cv2.cvtColor(rgb_img, cv2.COLOR_BGR2HSV)
-            
-            # Green mask
-            lower_green = np.array([35, 40, 40])
-            upper_green = np.array([85, 255, 255])
-            green_mask = cv2.inRange(hsv, lower_green, upper_green)
-            
-            # Create alpha channel
-            alpha = np.where(green_mask == 255, 0, 255).astype(np.uint8)
-            
-            # Combine with RGB
-            if img.shape[2] == 4:
-                rgba = img.copy()
-                rgba[:, :, 3] = alpha
-            else:
-                rgba = cv2.cvtColor(rgb_img, cv2.COLOR_BGR2BGRA)
-                rgba[:, :, 3] = alpha
+                print(f"⚠️  Warning: Could not load {asset_path(chip_type)}")
+                # Create placeholder
+                rgba = np.ones((100, 200, 4), dtype=np.uint8) * 255
+                self.sprites[chip_type] = Sprite(rgba)
             
             self.templates[chip_type] = rgba
             print(f"✓ {chip_type}: {rgba.shape}")
@@ -121,25 +113,24 @@ class ChipGame:
             'digits': digits,
             'value': value,
             'is_fake': is_fake,
-            'template': template
+            'template': template,
+            'sprite': self.sprites[chip_type]
         }
         
         self.chips.append(chip)
+        self.update_scene()
         self.next_chip_id += 1
         
         # Update stats
-        if is_fake:
-            self.fake_count += 1
-        else:
-            self.real_count += 1
-            self.total_value += value
+        self.ledger.commit({'id': chip['id'], 'type': chip_type, 'digits': digits,
+                            'value': value, 'authentic': not is_fake})
         
         status = "FAKE" if is_fake else "REAL"
         print(f"✨ Spawned {chip_type} #{chip['id']} - {status} - {value} CR")
     
     def overlay_image(self, background, overlay, x, y):
-        """Overlay image with alpha blending"""
-        h, w = overlay.shape[:2]
+        """Overlay sprite with alpha blending"""
+        h, w = overlay.height, overlay.width
         
         # Check bounds
         if x + w > background.shape[1] or y + h > background.shape[0]:
@@ -147,16 +138,8 @@ class ChipGame:
         if x < 0 or y < 0:
             return background
         
-        # Extract alpha channel
-        alpha = overlay[:, :, 3] / 255.0
-        alpha_3ch = np.stack([alpha] * 3, axis=-1)
-        
         # Blend
-        roi = background[y:y+h, x:x+w]
-        foreground = overlay[:, :, :3]
-        
-        blended = (alpha_3ch * foreground + (1 - alpha_3ch) * roi).astype(np.uint8)
-        background[y:y+h, x:x+w] = blended
+        overlay.blit(background, x, y)
         
         return background
     
@@ -199,51 +182,77 @@ class ChipGame:
     
     def draw_stats(self, frame):
         """Draw statistics panel"""
-        # Semi-transparent overlay
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (10, 10), (350, 150), (0, 0, 0), -1)
-        frame = cv2.addWeighted(overlay, 0.7, frame, 0.3, 0)
+        # Semi-transparent overlay, blended over the panel only
+        panel = frame[10:151, 10:351]
+        cv2.addWeighted(np.zeros_like(panel), 0.7, panel, 0.3, 0, dst=panel)
         
         # Stats
         y_offset = 40
-        cv2.putText(frame, f"Total Value: {self.total_value} CR", (20, y_offset),
+        cv2.putText(frame, f"Total Value: {self.ledger.total_value} CR", (20, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
         y_offset += 30
-        cv2.putText(frame, f"Real Chips: {self.real_count}", (20, y_offset),
+        cv2.putText(frame, f"Real Chips: {self.ledger.real_count}", (20, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 200, 0), 2)
         
         y_offset += 30
-        cv2.putText(frame, f"Fake Chips: {self.fake_count}", (20, y_offset),
+        cv2.putText(frame, f"Fake Chips: {self.ledger.fake_count}", (20, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
         
         y_offset += 30
         cv2.putText(frame, f"Total Chips: {len(self.chips)}", (20, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
         
-        # FPS
-        if self.fps_queue:
-            fps = sum(self.fps_queue) / len(self.fps_queue)
+        # FPS over the whole loop, including the pacer's wait
+        if self.frame_times:
+            fps = len(self.frame_times) / sum(self.frame_times)
             cv2.putText(frame, f"FPS: {fps:.1f}", (self.width - 150, 40),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
         
         return frame
     
-    def render_frame(self):
-        """Render current frame"""
-        # Create background
+    def draw_background(self):
+        """Grid background"""
         frame = np.ones((self.height, self.width, 3), dtype=np.uint8) * 50
-        
-        # Draw grid
         for x in range(0, self.width, 100):
             cv2.line(frame, (x, 0), (x, self.height), (70, 70, 70), 1)
         for y in range(0, self.height, 100):
             cv2.line(frame, (0, y), (self.width, y), (70, 70, 70), 1)
-        
-        # Draw chips
-        for chip in self.chips:
-            frame = self.overlay_image(frame, chip['template'], chip['x'], chip['y'])
-            self.draw_chip_info(frame, chip)
+        return frame
+    
+    def update_scene(self):
+        """
+        Bring the cached scene up to date. Chips never move and new chips are
+        drawn on top, so added chips are drawn onto the existing scene; only
+        removing chips needs a rebuild (see invalidate_scene).
+        """
+        if self.scene is None:
+            self.scene = self.draw_background()
+            self.scene_chips = 0
+        for chip in self.chips[self.scene_chips:]:
+            self.overlay_image(self.scene, chip['sprite'], chip['x'], chip['y'])
+            self.draw_chip_info(self.scene, chip)
+        self.scene_chips = len(self.chips)
+    
+    def invalidate_scene(self):
+        """Drop the cached scene after chips are removed"""
+        self.scene = None
+    
+    def remove_last_chip(self):
+        """Remove the most recently spawned chip"""
+        if self.chips:
+            chip = self.chips.pop()
+            self.invalidate_scene()
+            print(f"↩️  Removed {chip['chip_type']} #{chip['id']}")
+    
+    def clear_chips(self):
+        self.chips.clear()
+        self.invalidate_scene()
+    
+    def render_frame(self):
+        """Render current frame: the cached scene plus the HUD"""
+        self.update_scene()
+        frame = self.scene.copy()
         
         # Draw stats
         frame = self.draw_stats(frame)
@@ -254,22 +263,20 @@ class ChipGame:
         """Main game loop"""
         print("🎮 Game started!\n")
         
+        last_frame = time.perf_counter()
         while True:
-            frame_start = time.time()
-            
             # Render
             frame = self.render_frame()
             
             # Display
             cv2.imshow("Intergalactic Riksbanken Chip Authenticator - Game", frame)
             
-            # Calculate FPS
-            frame_time = time.time() - frame_start
-            if frame_time > 0:
-                self.fps_queue.append(1.0 / frame_time)
+            # Handle keys (waits out the rest of the frame)
+            key = self.pacer.wait_key(changed=False)
             
-            # Handle keys
-            key = cv2.waitKey(1) & 0xFF
+            now = time.perf_counter()
+            self.frame_times.append(now - last_frame)
+            last_frame = now
             
             if key == ord('q'):
                 break
@@ -279,31 +286,34 @@ class ChipGame:
                 self.spawn_chip('SILVER')
             elif key == ord('3'):
                 self.spawn_chip('BRONZE')
+            elif key == ord('u'):
+                self.remove_last_chip()
             elif key == ord('c'):
                 print("🗑️  Clearing all chips...")
-                self.chips.clear()
+                self.clear_chips()
             elif key == ord('p'):
                 self.paused = not self.paused
                 print(f"{'⏸️  Paused' if self.paused else '▶️  Resumed'}")
             elif key == ord('r'):
                 print("🔄 Resetting statistics...")
-                self.total_value = 0
-                self.real_count = 0
-                self.fake_count = 0
-                self.chips.clear()
+                self.ledger.reset()
+                self.clear_chips()
         
         cv2.destroyAllWindows()
+        self.ledger.close()
         
         print(f"\n📊 Final Statistics:")
-        print(f"   Total Value: {self.total_value} CR")
-        print(f"   Real Chips: {self.real_count}")
-        print(f"   Fake Chips: {self.fake_count}")
+        print(f"   Total Value: {self.ledger.total_value} CR")
+        print(f"   Real Chips: {self.ledger.real_count}")
+        print(f"   Fake Chips: {self.ledger.fake_count}")
+        self.ledger.print_summary()
+        self.pacer.print_stats()
         print("\n✅ Game ended\n")
 
 
-def main():
+def main(**kwargs):
     """Entry point"""
-    game = ChipGame(width=1280, height=720)
+    game = ChipGame(width=1280, height=720, **kwargs)
     game.run()
 
 
@@ -0,0 +1,180 @@
+"""
+Stage Instrumentation
+Per-stage frame timing with rolling percentiles, for the HUD and exit reports
+"""
+
+import json
+import time
+from contextlib import nullcontext
+
+import cv2
+import numpy as np
+
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    """Reusable timer that adds its elapsed time to a profiler stage"""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+class StageProfiler:
+    """
+    Time the stages of a frame loop and keep rolling p50/p95/p99 per stage.
+
+    Stage times add up within a frame (a stage run once per scan region
+    counts once per frame), and end_frame() files the frame's totals. While
+    disabled, stage() hands back a shared no-op context and nothing is kept.
+    """
+
+    def __init__(self, enabled=True, window=300, budget_ms=1000 / 30):
+        """
+        Initialize profiler
+
+        Args:
+            enabled: Collect timings (toggle later with enabled / toggle())
+            window: Frames kept per stage for the percentiles
+            budget_ms: Frame budget stages are compared against
+        """
+        self.enabled = enabled
+        self.window = window
+        self.budget_ms = budget_ms
+        self.reset()
+
+    def reset(self):
+        """Drop all samples"""
+        self.samples = {}  # stage -> ring buffer of per-frame ms
+        self.order = []  # stages in first-seen order, for display
+        self.current = {}
+        self.stages = {}
+        self.frames = 0
+        self.frame_start = None
+
+    def toggle(self):
+        """Switch collection on or off; samples restart when switched on"""
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.reset()
+        return self.enabled
+
+    def stage(self, name):
+        """Context manager timing one stage of the current frame"""
+        if not self.enabled:
+            return _NULL_STAGE
+        timer = self.stages.get(name)
+        if timer is None:
+            timer = self.stages[name] = _Stage(self, name)
+        return timer
+
+    def add(self, name, seconds):
+        """Add time to a stage of the current frame"""
+        if self.enabled:
+            self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def end_frame(self):
+        """File the current frame's stage times; the frame total is the time since the previous call"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.current['frame'] = now - self.frame_start
+        self.frame_start = now
+
+        slot = self.frames % self.window
+        for name, seconds in self.current.items():
+            ring = self.samples.get(name)
+            if ring is None:
+                ring = self.samples[name] = np.full(self.window, np.nan)
+                self.order.append(name)
+            ring[slot] = seconds * 1000
+        # Stages skipped this frame count as zero so every ring covers the same frames
+        for name, ring in self.samples.items():
+            if name not in self.current:
+                ring[slot] = 0.0
+        self.current = {}
+        self.frames += 1
+
+    def summary(self):
+        """
+        Percentiles over the window
+
+        Returns:
+            dict: stage -> {'p50', 'p95', 'p99', 'mean', 'max'} in ms
+        """
+        summary = {}
+        for name in self.order:
+            values = self.samples[name]
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+                continue
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            summary[name] = {'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                             'mean': float(values.mean()), 'max': float(values.max())}
+        return summary
+
+    def fps(self):
+        """Frames per second over the window: frames / total frame time"""
+        ring = self.samples.get('frame')
+        if ring is None:
+            return 0.0
+        values = ring[~np.isnan(ring)]
+        return values.size / (values.sum() / 1000) if values.sum() > 0 else 0.0
+
+    def draw(self, frame, x, y):
+        """
+        Draw a stage table onto the frame; stages whose p95 exceeds the
+        frame budget are shown in red
+
+        Returns:
+            np.ndarray: The frame
+        """
+        summary = self.summary()
+        if not summary:
+            return frame
+        rows = [(name, s) for name, s in summary.items() if name != 'frame']
+        if 'frame' in summary:
+            rows.append(('frame', summary['frame']))
+
+        height = 30 + 18 * len(rows)
+        panel = frame[y:y + height, x:x + 300]
+        cv2.addWeighted(np.zeros_like(panel), 0.7, panel, 0.3, 0, dst=panel)
+        cv2.putText(frame, f"{'stage':<12} p50   p95   p99 ms", (x + 8, y + 18),
+                    cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+        for i, (name, s) in enumerate(rows):
+            color = (0, 0, 255) if s['p95'] > self.budget_ms else (255, 255, 255)
+            cv2.putText(frame, f"{name[:12]:<12}{s['p50']:5.1f} {s['p95']:5.1f} {s['p99']:5.1f}",
+                        (x + 8, y + 36 + 18 * i), cv2.FONT_HERSHEY_PLAIN, 1.0, color, 1)
+        return frame
+
+    def dump(self, path=None):
+        """
+        Print the stage table, and write it as JSON when a path is given
+
+        Returns:
+            dict: summary()
+        """
+        summary = self.summary()
+        if not summary:
+            return summary
+        print(f"\n⏱️  Stage timings over the last {min(self.frames, self.window)} frames "
+              f"(budget {self.budget_ms:.1f} ms)")
+        print(f"   {'Stage':<14}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}  ms")
+        for name, s in summary.items():
+            flag = '  ❌ over budget at p95' if name != 'frame' and s['p95'] > self.budget_ms else ''
+            print(f"   {name:<14}{s['p50']:>8.2f}{s['p95']:>8.2f}{s['p99']:>8.2f}{s['max']:>8.2f}{flag}")
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'frames': self.frames, 'budget_ms': self.budget_ms, 'stages': summary}, f, indent=2)
+            print(f"   Saved to {path}")
+        return summary
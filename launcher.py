@@ -5,8 +5,76 @@ Select from simulator, camera, or interactive game modes
 
 import sys
 import os
+import threading
+import time
 
-def print_banner():
+class WarmRuntime:
+    """State the modes share, loaded in the background and kept across mode switches"""
+    
+    def __init__(self):
+        """Initialize empty runtime (call preload() to fill it in the background)"""
+        self.sim_assets = None
+        self.game_assets = None
+        self.authenticator = None
+        self.digit_reader = None
+        self.camera = None
+        self.camera_type = None
+        self.color_ranges = None
+        self.error = None
+        self.load_seconds = None
+        self.thread = None
+    
+    def preload(self):
+        """Start loading modules, templates and detector tables on a background thread"""
+        self.thread = threading.Thread(target=self._load, daemon=True)
+        self.thread.start()
+        return self
+    
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            import main, camera_main, game  # Module import cost is paid here too
+            from templates import load_chip_assets
+            from authenticity import ReferenceAuthenticator
+            from ocr import DigitReader
+            
+            self.sim_assets = load_chip_assets(scale=0.3)
+            self.game_assets = load_chip_assets()
+            authenticator = ReferenceAuthenticator.from_assets()
+            self.authenticator = authenticator if authenticator.descriptors else None
+            self.digit_reader = DigitReader()
+        except Exception as e:
+            self.error = e
+        self.load_seconds = time.perf_counter() - start
+    
+    def wait(self):
+        """Block until preloading finishes; a failed preload leaves the modes to load for themselves"""
+        if self.thread:
+            self.thread.join()
+        if self.error:
+            print(f"⚠️  Preload failed ({self.error}) - loading on demand")
+            self.error = None
+    
+    def ready(self):
+        return self.thread is not None and not self.thread.is_alive()
+    
+    def open_camera(self):
+        """Connect a camera once; later camera sessions reuse the handle and calibration"""
+        import camera_main
+        if self.camera is None:
+            camera_type = camera_main.choose_camera_type()
+            # Recorded only once the camera opens, so a failed connection is retried next time
+            self.camera = camera_main.open_camera(camera_type)
+            self.camera_type = camera_type
+        return self.camera
+    
+    def close(self):
+        """Release the shared camera"""
+        if self.camera:
+            self.camera.release()
+            self.camera = None
+
+def print_banner(runtime=None):
     """Print application banner"""
     print("\n" + "="*60)
     print("🎮 INTERGALACTIC RIKSBANKEN CHIP AUTHENTICATOR")
@@ -17,35 +85,58 @@ def print_banner():
     print("  3. Interactive Game - Manual chip spawning & testing")
     print("  Q. Quit")
     print("="*60)
+    if runtime and runtime.ready() and runtime.load_seconds is not None:
+        print(f"⚡ Warm start ready (preloaded in {runtime.load_seconds:.2f}s)")
 
-def run_simulator():
+def run_simulator(runtime):
     """Run conveyor belt simulator"""
     print("\n🎬 Starting Simulator Mode...")
+    runtime.wait()
     from main import ConveyorSimulator
-    sim = ConveyorSimulator(width=1280, height=720, conveyor_speed=3)
+    sim = ConveyorSimulator(width=1280, height=720, conveyor_speed=3, ledger_dir='ledger',
+                            assets=runtime.sim_assets)
     sim.run()
 
-def run_camera():
+def run_camera(runtime):
     """Run camera detection system"""
     print("\n📸 Starting Camera Mode...")
+    runtime.wait()
     import camera_main
-    camera_main.main()
+    camera = runtime.open_camera()
+    # A virtual camera brings an authenticator for the chips it films
+    authenticator = getattr(camera, 'authenticator', None) or runtime.authenticator
+    system = camera_main.CameraChipSystem(camera=camera, color_ranges=runtime.color_ranges,
+                                          authenticator=authenticator,
+                                          digit_reader=runtime.digit_reader)
+    if camera:
+        runtime.color_ranges = system.detector.color_ranges
+    system.run()
 
-def run_game():
+def run_game(runtime):
     """Run interactive game mode"""
     print("\n🎮 Starting Interactive Game Mode...")
+    runtime.wait()
     import game
-    game.main()
+    game.main(assets=runtime.game_assets)
 
 def main():
     """Main launcher"""
+    # Heavy state loads while the menu is showing and stays loaded between modes
+    runtime = WarmRuntime().preload()
+    try:
+        menu(runtime)
+    finally:
+        runtime.close()
+
+def menu(runtime):
+    """Mode selection loop"""
     while True:
-        print_banner()
+        print_banner(runtime)
         choice = input("\nEnter your choice (1/2/3/Q): ").strip().upper()
         
         if choice == '1':
             try:
-                run_simulator()
+                run_simulator(runtime)
             except KeyboardInterrupt:
                 print("\n\n↩️  Returning to main menu...")
             except Exception as e:
@@ -54,7 +145,7 @@ def main():
         
         elif choice == '2':
             try:
-                run_camera()
+                run_camera(runtime)
             except KeyboardInterrupt:
                 print("\n\n↩️  Returning to main menu...")
             except Exception as e:
@@ -63,7 +154,7 @@ def main():
         
         elif choice == '3':
             try:
-                run_game()
+                run_game(runtime)
             except KeyboardInterrupt:
                 print("\n\n↩️  Returning to main menu...")
             except Exception as e:
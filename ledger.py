@@ -0,0 +1,209 @@
+"""
+Session Ledger
+Running aggregates of committed chips, streamed to rotating append-only JSONL files
+"""
+
+import glob
+import json
+import os
+import time
+from collections import deque
+
+from templates import CHIP_TYPES
+
+
+class SessionLedger:
+    """
+    Record of every chip a mode commits (scans, counts or spawns).
+
+    Memory stays constant however long the shift: only running totals and
+    the last few entries are kept, and every entry is appended to disk when
+    a directory is given.
+    """
+
+    def __init__(self, mode, directory=None, sync_every=64, sync_interval=1.0,
+                 max_bytes=16 * 1024 * 1024, keep_recent=50):
+        """
+        Initialize ledger
+
+        Args:
+            mode: Name of the mode writing it ('simulator', 'camera', 'game')
+            directory: Where ledger files go (memory only when None)
+            sync_every: Entries written between fsyncs
+            sync_interval: Longest time in seconds between fsyncs while entries arrive
+            max_bytes: Size at which a file is closed and the next part started
+            keep_recent: Entries kept in memory for display
+        """
+        self.mode = mode
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.max_bytes = max_bytes
+        self.recent = deque(maxlen=keep_recent)
+
+        self.file = None
+        self.path = None
+        self.part = 0
+        self.bytes_written = 0
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.stamp = time.strftime('%Y%m%d-%H%M%S')
+
+        self.reset_totals()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.open_part()
+
+    def reset_totals(self):
+        """Zero the running aggregates"""
+        self.count = 0
+        self.real_count = 0
+        self.fake_count = 0
+        self.unreadable_count = 0
+        self.total_value = 0
+        self.by_type = {t: {'real': 0, 'fake': 0, 'unreadable': 0, 'value': 0} for t in CHIP_TYPES}
+
+    @property
+    def fake_rate(self):
+        """Fraction of committed chips that were fake"""
+        return self.fake_count / self.count if self.count else 0.0
+
+    def commit(self, entry):
+        """
+        Add one chip to the totals and the on-disk ledger
+
+        Args:
+            entry: Dict with at least 'type', 'value' and 'authentic'; an authentic
+                   chip with 'readable' False counts as unreadable, not real
+        """
+        status = entry_status(entry)
+        self.count += 1
+        totals = self.by_type.setdefault(entry['type'], {'real': 0, 'fake': 0, 'unreadable': 0, 'value': 0})
+        totals[status] += 1
+        if status == 'real':
+            self.real_count += 1
+            self.total_value += entry['value']
+            totals['value'] += entry['value']
+        elif status == 'fake':
+            self.fake_count += 1
+        else:
+            self.unreadable_count += 1
+
+        self.recent.append(entry)
+        if self.file:
+            self.write({'t': round(time.time(), 3), **entry})
+
+    def reset(self):
+        """Zero the totals; the reset is marked in the ledger so files still add up"""
+        self.reset_totals()
+        self.recent.clear()
+        if self.file:
+            self.write({'t': round(time.time(), 3), 'event': 'reset'})
+            self.sync()
+
+    def write(self, record):
+        """Append one JSON line, syncing and rotating as configured"""
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        self.file.write(line)
+        self.bytes_written += len(line)
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+        if self.bytes_written >= self.max_bytes:
+            self.close_part()
+            self.part += 1
+            self.open_part()
+
+    def open_part(self):
+        """Start the next ledger file"""
+        self.path = os.path.join(self.directory, f"ledger-{self.mode}-{self.stamp}-{self.part:03d}.jsonl")
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.bytes_written = self.file.tell()
+
+    def close_part(self):
+        self.sync()
+        self.file.close()
+        self.file = None
+
+    def sync(self):
+        """Flush buffered lines and fsync them to disk"""
+        if self.file and self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        """Sync and close the current file"""
+        if self.file:
+            self.close_part()
+
+    def summary(self):
+        """Running totals as a dict"""
+        return {'count': self.count, 'real': self.real_count, 'fake': self.fake_count,
+                'unreadable': self.unreadable_count, 'value': self.total_value,
+                'fake_rate': self.fake_rate, 'by_type': self.by_type}
+
+    def print_summary(self):
+        """Print per-type totals"""
+        print(f"   Committed: {self.count} | Fake rate: {self.fake_rate * 100:.1f}%")
+        for chip_type, totals in self.by_type.items():
+            if any(totals.values()):
+                print(f"   {chip_type:<7} real {totals['real']:>5} | fake {totals['fake']:>5} | "
+                      f"unreadable {totals['unreadable']:>5} | {totals['value']} CR")
+        if self.path:
+            print(f"   Ledger: {self.path}")
+
+
+def entry_status(entry):
+    """'real', 'fake' or 'unreadable' for a ledger entry"""
+    if not entry['authentic']:
+        return 'fake'
+    if not entry.get('readable', True):
+        return 'unreadable'
+    return 'real'
+
+
+def replay_totals(paths):
+    """
+    Rebuild totals from ledger files (e.g. after a crash), since the last reset
+
+    A line cut short by a crash is skipped.
+
+    Args:
+        paths: Ledger files in write order
+
+    Returns:
+        SessionLedger: Memory-only ledger holding the totals
+    """
+    ledger = SessionLedger('replay')
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('event') == 'reset':
+                    ledger.reset()
+                else:
+                    ledger.commit(record)
+    return ledger
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarise session ledger files")
+    parser.add_argument('paths', nargs='+', help="Ledger files, or a directory of them")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        paths.extend(sorted(glob.glob(os.path.join(path, 'ledger-*.jsonl'))) if os.path.isdir(path) else [path])
+
+    ledger = replay_totals(paths)
+    print(f"\n📒 {len(paths)} ledger file(s)")
+    print(f"   Total Value: {ledger.total_value} CR | Real: {ledger.real_count} | "
+          f"Fake: {ledger.fake_count} | Unreadable: {ledger.unreadable_count}")
+    ledger.print_summary()
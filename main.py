@@ -7,190 +7,190 @@ import cv2
 import numpy as np
 import random
 import os
+import secrets
+import time
+
+from sprites import Sprite, composite
+from variants import VariantPool
+from chip_store import ChipStore
+from session import SessionRecorder, CHECKPOINT_EVERY
+from ledger import SessionLedger
+from templates import load_chip_assets, CHIP_TYPES
+from pacing import FramePacer
+from instrumentation import StageProfiler
+from markers import encode_marker
 
 
 class ConveyorSimulator:
     """Simulates chips on a green conveyor belt"""
     
-    def __init__(self, width=1280, height=720, conveyor_speed=3):
-        """Initialize simulator"""
+    def __init__(self, width=1280, height=720, conveyor_speed=3, frame_rate=30, seed=None, ledger_dir=None,
+                 assets=None, profile=False, embed_markers=False):
+        """
+        Initialize simulator
+        
+        Args:
+            seed: Session seed; every random choice comes from it, so a seed
+                  and the keys pressed reproduce a session exactly (random when None)
+            ledger_dir: Directory the session ledger streams scanned chips to
+                        (totals are kept in memory only when None)
+            assets: Preloaded load_chip_assets(scale=0.3) output (loaded here when None)
+            profile: Start with per-stage timing on (toggle with I)
+            embed_markers: Stamp a frame counter and timestamp into displayed frames,
+                           for latency measurement (see markers.py)
+        """
+        self.seed = secrets.randbits(63) if seed is None else seed
+        self.rng = random.Random(self.seed)
         self.width = width
         self.height = height
         self.conveyor_speed = conveyor_speed
+        self.frame_rate = frame_rate  # Nominal frames per second of simulated time
         
         # Conveyor belt is 50% of screen width, centered
         self.belt_width = width // 2
         self.belt_x = (width - self.belt_width) // 2
         
-        # Load chip templates
-        self.chip_templates = self.load_chip_templates()
+        # Belt stripes repeat every stripe_period px; texture is built on first render
+        self.stripe_period = 100
+        self.belt_texture = None
+        
+        # Load chip templates (read-only, served from the template cache after the first run)
+        if assets is None:
+            assets = self.load_chip_templates()
+        self.chip_templates = {t: asset['template'] for t, asset in assets.items()}
         self.reference_templates = self.chip_templates.copy()  # Store clean references
+        self.chip_sprites = {t: asset['sprite'] for t, asset in assets.items()}
         self.fake_threshold = 0.05  # 5% difference threshold
+        self.reference_grays = {t: asset['gray'] for t, asset in assets.items()}
         
-        # Active chips on belt
-        self.chips = []
+        # Counterfeit templates are generated and scored in the background
+        self.variant_pool = VariantPool(self.reference_templates, self.calculate_image_differences,
+                                        seed=self.seed).start()
+        
+        # Active chips on belt, stored column-wise; chips beyond max_labels are drawn unlabelled
+        self.chips = ChipStore()
+        self.max_labels = 200
         self.next_chip_id = 0
         
-        # Spawning control
+        # Spawning control; a spawn schedule (see stress.py) replaces the random interval
         self.frame_count = 0
-        self.spawn_interval = random.randint(30, 60)
+        self.spawn_interval = self.rng.randint(30, 60)
+        self.spawn_schedule = None
+        self.belt_offset = 0.0  # Distance the belt has moved, so speed changes keep the stripes continuous
+        self.verbose = True  # Print a line per spawned chip
+        self.recorder = None  # SessionRecorder receiving spawns and keypresses
+        self.embed_markers = embed_markers
         
         # Statistics
-        self.total_value = 0
-        self.total_real = 0
-        self.total_fake = 0
-        self.session_chips = []
+        self.ledger = SessionLedger('simulator', ledger_dir)
+        self.profiler = StageProfiler(enabled=profile, budget_ms=1000 / frame_rate)
         
         print("🎬 Intergalactic Riksbanken Chip Authenticator initialized")
         print(f"   Resolution: {width}x{height}")
         print(f"   Belt width: {self.belt_width}px (50% of screen)")
+        print(f"   Seed: {self.seed}")
         
     def load_chip_templates(self):
-        """Load chip templates from PNG files"""
-        templates = {}
-        assets_dir = os.path.join(os.path.dirname(__file__), 'assets')
-        
-        for chip_type in ['GOLD', 'SILVER', 'BRONZE']:
-            filename = f"{chip_type.lower()}.png"
-            filepath = os.path.join(assets_dir, filename)
-            
-            if os.path.exists(filepath):
-                img = cv2.imread(filepath)
-                if img is not None:
-                    img_clean = self.remove_green_background(img)
-                    scale = 0.3
-                    h, w = img_clean.shape[:2]
-                    img_clean = cv2.resize(img_clean, (int(w * scale), int(h * scale)))
-                    templates[chip_type] = img_clean
-                    print(f"   ✓ {chip_type}: {img_clean.shape}")
-        
-        return templates
+        """Load chip templates, their grayscale references and sprites at 0.3x"""
+        assets = load_chip_assets(scale=0.3)
+        for chip_type, asset in assets.items():
+            print(f"   ✓ {chip_type}: {asset['template'].shape}")
+        return assets
     
-    def remove_green_background(self, img):
-        """Remove green screen background"""
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        lower_green = np.array([35, 40, 40])
-        upper_green = np.array([85, 255, 255])
-        green_mask = cv2.inRange(hsv, lower_green, upper_green)
-        mask = cv2.bitwise_not(green_mask)
-        b, g, r = cv2.split(img)
-        return cv2.merge([b, g, r, mask])
+    def reference_gray(self, chip_type):
+        """Grayscale reference template of a chip type, converted once"""
+        if chip_type not in self.reference_grays:
+            self.reference_grays[chip_type] = cv2.cvtColor(self.reference_templates[chip_type][:, :, :3], cv2.COLOR_BGR2GRAY)
+        return self.reference_grays[chip_type]
     
-    def calculate_image_difference(self, img1, img2):
-        """
-        Calculate percentage difference between two images.
-        Returns value between 0.0 (identical) and 1.0 (completely different)
+    def calculate_image_differences(self, chip_type, candidates):
         """
-        # Ensure same size
-        if img1.shape != img2.shape:
-            img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
+        Score a batch of candidate images of one chip type against its reference,
+        as the share of grayscale pixels differing by more than 10, in one NumPy pass.
         
-        # Convert to grayscale if needed (ignore alpha channel)
-        if len(img1.shape) == 3 and img1.shape[2] == 4:
-            img1_gray = cv2.cvtColor(img1[:, :, :3], cv2.COLOR_BGR2GRAY)
-        else:
-            img1_gray = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
+        Args:
+            chip_type: Chip type whose reference template is compared against
+            candidates: List of BGR/BGRA images
             
-        if len(img2.shape) == 3 and img2.shape[2] == 4:
-            img2_gray = cv2.cvtColor(img2[:, :, :3], cv2.COLOR_BGR2GRAY)
-        else:
-            img2_gray = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-        
-        # Calculate absolute difference
-        diff = cv2.absdiff(img1_gray, img2_gray)
-        
-        # Calculate percentage of different pixels
-        non_zero = np.count_nonzero(diff > 10)  # Threshold to ignore minor variations
-        total_pixels = diff.size
-        difference_percent = non_zero / total_pixels
-        
-        return difference_percent
+        Returns:
+            np.ndarray: Difference ratio per candidate, 0.0 (identical) to 1.0
+        """
+        reference = self.reference_gray(chip_type)
+        if not candidates:
+            return np.zeros(0)
+        h, w = reference.shape
+        
+        # Stack the candidates as one tall image so a single cvtColor converts them all
+        stack = np.empty((len(candidates) * h, w, 3), dtype=np.uint8)
+        for i, candidate in enumerate(candidates):
+            if candidate.shape[:2] != (h, w):
+                candidate = cv2.resize(candidate, (w, h))
+            stack[i * h:(i + 1) * h] = candidate[:, :, :3]
+        grays = cv2.cvtColor(stack, cv2.COLOR_BGR2GRAY).reshape(len(candidates), h, w)
+        
+        diff = cv2.absdiff(grays, np.broadcast_to(reference, grays.shape))
+        return np.count_nonzero(diff > 10, axis=(1, 2)) / reference.size
     
-    def apply_fake_alterations(self, template, chip_type):
+    def build_belt_texture(self):
         """
-        Apply random alterations to template to create a fake chip.
-        Returns altered template and whether it's fake based on 5% threshold.
+        Precompute the conveyor background as one tall texture.
+        It is one stripe period taller than the frame, so every belt phase is a slice of it.
         """
-        altered = template.copy()
-        
-        # Randomly decide to alter (30% chance of creating a fake)
-        if random.random() > 0.3:
-            return altered, False  # Not altered, authentic
-        
-        # Apply various alterations
-        alteration_type = random.choice(['noise', 'blur', 'color', 'rotate', 'crop'])
-        
-        if alteration_type == 'noise':
-            # Add noise
-            noise = np.random.randint(-30, 30, altered.shape, dtype=np.int16)
-            altered = np.clip(altered.astype(np.int16) + noise, 0, 255).astype(np.uint8)
-        
-        elif alteration_type == 'blur':
-            # Add blur
-            altered[:, :, :3] = cv2.GaussianBlur(altered[:, :, :3], (15, 15), 0)
-        
-        elif alteration_type == 'color':
-            # Change color slightly
-            hsv = cv2.cvtColor(altered[:, :, :3], cv2.COLOR_BGR2HSV)
-            hsv[:, :, 0] = (hsv[:, :, 0] + random.randint(10, 30)) % 180  # Hue shift
-            altered[:, :, :3] = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-        
-        elif alteration_type == 'rotate':
-            # Rotate slightly
-            h, w = altered.shape[:2]
-            center = (w // 2, h // 2)
-            angle = random.uniform(-15, 15)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            altered = cv2.warpAffine(altered, M, (w, h), borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0, 0))
-        
-        elif alteration_type == 'crop':
-            # Add black patches
-            h, w = altered.shape[:2]
-            for _ in range(random.randint(2, 5)):
-                x1 = random.randint(0, w - 20)
-                y1 = random.randint(0, h - 20)
-                x2 = x1 + random.randint(10, 30)
-                y2 = y1 + random.randint(10, 30)
-                altered[y1:y2, x1:x2] = 0
-        
-        # Check if alteration exceeds 5% threshold
-        diff = self.calculate_image_difference(template, altered)
-        is_fake = diff > self.fake_threshold
-        
-        return altered, is_fake
-    
-    def create_green_conveyor_background(self):
-        """Create green conveyor belt background"""
-        background = np.ones((self.height, self.width, 3), dtype=np.uint8) * 50
+        tex_height = self.height + self.stripe_period
+        texture = np.full((tex_height, self.width, 3), 50, dtype=np.uint8)
         green_color = (60, 180, 75)
-        belt_area = np.ones((self.height, self.belt_width, 3), dtype=np.uint8)
+        belt_area = np.empty((tex_height, self.belt_width, 3), dtype=np.uint8)
         belt_area[:] = green_color
         
-        belt_y_offset = (self.frame_count * self.conveyor_speed) % 100
-        for i in range(-1, self.height // 100 + 2):
-            y = i * 100 + belt_y_offset
-            if 0 <= y < self.height:
-                cv2.line(belt_area, (0, int(y)), (self.belt_width, int(y)), (40, 140, 55), 2)
+        for y in range(0, tex_height + self.stripe_period, self.stripe_period):
+            cv2.line(belt_area, (0, y), (self.belt_width, y), (40, 140, 55), 2)
         
-        noise = np.random.randint(-10, 10, belt_area.shape, dtype=np.int16)
+        # Noise is baked into the texture once and scrolls with the belt
+        noise = np.random.default_rng(self.seed).integers(-10, 10, belt_area.shape, dtype=np.int16)
         belt_area = np.clip(belt_area.astype(np.int16) + noise, 0, 255).astype(np.uint8)
-        background[:, self.belt_x:self.belt_x + self.belt_width] = belt_area
+        texture[:, self.belt_x:self.belt_x + self.belt_width] = belt_area
         
-        cv2.line(background, (self.belt_x, 0), (self.belt_x, self.height), (200, 200, 200), 3)
-        cv2.line(background, (self.belt_x + self.belt_width, 0), (self.belt_x + self.belt_width, self.height), (200, 200, 200), 3)
+        cv2.line(texture, (self.belt_x, 0), (self.belt_x, tex_height), (200, 200, 200), 3)
+        cv2.line(texture, (self.belt_x + self.belt_width, 0), (self.belt_x + self.belt_width, tex_height), (200, 200, 200), 3)
         
-        return background
+        return texture
+    
+    def create_green_conveyor_background(self):
+        """Create green conveyor belt background by slicing the cached belt texture"""
+        if self.belt_texture is None:
+            self.belt_texture = self.build_belt_texture()
+        
+        belt_y_offset = self.belt_offset % self.stripe_period
+        start = (self.stripe_period - int(belt_y_offset)) % self.stripe_period
+        return self.belt_texture[start:start + self.height].copy()
     
     def spawn_chip(self):
         """Spawn a new chip with fake detection based on 5% difference threshold"""
-        chip_type = random.choices(['GOLD', 'SILVER', 'BRONZE'], weights=[0.15, 0.35, 0.50])[0]
-        
-        if chip_type not in self.chip_templates:
-            return
-        
-        # Get reference template and apply potential alterations
-        reference_template = self.reference_templates[chip_type]
-        altered_template, is_fake = self.apply_fake_alterations(reference_template, chip_type)
+        self.spawn_chips(1)
+    
+    def spawn_chips(self, count):
+        """
+        Spawn several chips. Altered chips take a pre-scored template from the
+        variant pool, so spawning does no image work and chips share templates.
+        """
+        for _ in range(count):
+            chip_type = self.rng.choices(['GOLD', 'SILVER', 'BRONZE'], weights=[0.15, 0.35, 0.50])[0]
+            if chip_type not in self.chip_templates:
+                continue
+            
+            # Randomly decide to alter (30% chance of creating a fake)
+            if self.rng.random() > 0.3:
+                self.add_chip(chip_type, self.reference_templates[chip_type], 0.0, self.chip_sprites[chip_type])
+            else:
+                variant = self.variant_pool.get(chip_type, rng=self.rng)
+                self.add_chip(chip_type, variant['template'], variant['difference'], variant['sprite'])
+    
+    def add_chip(self, chip_type, altered_template, diff_percent, sprite=None):
+        """
+        Place a chip above the belt.
+        diff_percent is its difference from the reference; templates and sprites are shared, never copied.
+        """
+        is_fake = diff_percent > self.fake_threshold
         
         h, w = altered_template.shape[:2]
         
@@ -201,77 +201,78 @@ class ConveyorSimulator:
         else:
             authentic = True
             if chip_type == 'GOLD':
-                digits = [random.randint(1, 9) for _ in range(3)]
+                digits = [self.rng.randint(1, 9) for _ in range(3)]
                 value = (digits[0] * 100 + digits[1] * 10 + digits[2]) * 10
             elif chip_type == 'SILVER':
-                digits = [random.randint(1, 9) for _ in range(3)]
+                digits = [self.rng.randint(1, 9) for _ in range(3)]
                 value = digits[0] * 100 + digits[1] * 10 + digits[2]
             else:
-                digits = [random.randint(1, 9) for _ in range(2)]
+                digits = [self.rng.randint(1, 9) for _ in range(2)]
                 value = digits[0] * digits[1]
         
-        x = random.randint(self.belt_x + 10, self.belt_x + self.belt_width - w - 10)
+        x = self.rng.randint(self.belt_x + 10, self.belt_x + self.belt_width - w - 10)
         y = -h - 10
         
-        # Calculate actual difference percentage for display
-        diff_percent = self.calculate_image_difference(reference_template, altered_template)
-        
-        chip = {
-            'id': self.next_chip_id, 'type': chip_type, 'x': x, 'y': y,
-            'width': w, 'height': h, 'template': altered_template,
-            'value': value, 'authentic': authentic,
-            'velocity_y': self.conveyor_speed, 'counted': False,
-            'difference': diff_percent  # Store difference for display
-        }
+        if sprite is None:
+            sprite = Sprite(altered_template)
         
-        self.chips.append(chip)
+        chip = self.chips.add(chip_type, x, y, altered_template, sprite, value, authentic,
+                              velocity_y=self.conveyor_speed, difference=diff_percent,
+                              chip_id=self.next_chip_id)
         self.next_chip_id += 1
+        if self.recorder:
+            self.recorder.spawn(self.frame_count, CHIP_TYPES.index(chip_type), chip['id'], x, value, diff_percent)
         fake_status = 'FAKE' if is_fake else 'REAL'
-        print(f"✨ Spawned {chip_type} #{chip['id']} - {fake_status} - {value} CR (Diff: {diff_percent*100:.1f}%)")
+        if self.verbose:
+            print(f"✨ Spawned {chip_type} #{chip['id']} - {fake_status} - {value} CR (Diff: {diff_percent*100:.1f}%)")
+        return chip
     
     def update_chips(self):
-        """Update chip positions"""
-        chips_to_remove = []
-        for i, chip in enumerate(self.chips):
-            chip['y'] += chip['velocity_y']
-            
-            if chip['y'] > self.height // 2 and not chip['counted']:
-                chip['counted'] = True
-                if chip['authentic']:
-                    self.total_real += 1
-                    self.total_value += chip['value']
-                else:
-                    self.total_fake += 1
-                self.session_chips.append({'type': chip['type'], 'value': chip['value'], 'authentic': chip['authentic']})
-            
-            if chip['y'] > self.height + 50:
-                chips_to_remove.append(i)
-        
-        for i in reversed(chips_to_remove):
-            del self.chips[i]
+        """
+        Update chip positions.
+        Returns the ledger entries for chips that crossed the scan line this frame.
+        """
+        chips = self.chips
+        chips.advance()
+        
+        scanned = []
+        for i in chips.mark_crossed(self.height // 2).tolist():
+            chip = chips[i]
+            entry = {'id': chip['id'], 'frame': self.frame_count, 'type': chip['type'],
+                     'value': chip['value'], 'authentic': chip['authentic']}
+            self.ledger.commit(entry)
+            scanned.append(entry)
+        
+        chips.remove_beyond(self.height + 50)
+        return scanned
+    
+    def step(self):
+        """Advance the simulation by one frame and return the chips scanned in it"""
+        self.frame_count += 1
+        self.belt_offset += self.conveyor_speed
+        scanned = self.update_chips()
+        if self.spawn_schedule is not None:
+            count = self.spawn_schedule.count(self.frame_count, self.frame_rate)
+            if count:
+                self.spawn_chips(count)
+        elif self.frame_count % self.spawn_interval == 0:
+            self.spawn_chip()
+            self.spawn_interval = self.rng.randint(30, 60)
+        return scanned
+    
+    def set_conveyor_speed(self, speed):
+        """Change belt speed; chips already on the belt move with it"""
+        self.conveyor_speed = speed
+        self.chips.column('velocity_y')[:] = speed
     
     def overlay_image_alpha(self, background, overlay, x, y):
-        """Overlay RGBA image on BGR background"""
-        if overlay.shape[2] != 4:
-            h, w = overlay.shape[:2]
-            if 0 <= y < background.shape[0] and 0 <= x < background.shape[1]:
-                y_end = min(y + h, background.shape[0])
-                x_end = min(x + w, background.shape[1])
-                background[y:y_end, x:x_end] = overlay[:y_end-y, :x_end-x, :3]
-            return
-        
-        h, w = overlay.shape[:2]
-        if y + h > background.shape[0]: h = background.shape[0] - y; overlay = overlay[:h, :, :]
-        if x + w > background.shape[1]: w = background.shape[1] - x; overlay = overlay[:, :w, :]
-        if y < 0: overlay = overlay[-y:, :, :]; h += y; y = 0
-        if x < 0: overlay = overlay[:, -x:, :]; w += x; x = 0
-        if h <= 0 or w <= 0: return
-        
-        alpha = np.expand_dims(overlay[:, :, 3] / 255.0, axis=2)
-        foreground = overlay[:, :, :3]
-        background_section = background[y:y+h, x:x+w]
-        blended = (alpha * foreground + (1 - alpha) * background_section).astype(np.uint8)
-        background[y:y+h, x:x+w] = blended
+        """
+        Overlay RGBA image on BGR background.
+        Pass a Sprite to reuse its cached conversion; raw images are converted per call.
+        """
+        if not isinstance(overlay, Sprite):
+            overlay = Sprite(overlay)
+        overlay.blit(background, x, y)
     
     def draw_ui(self, frame):
         """Draw UI overlay"""
@@ -283,30 +284,55 @@ class ConveyorSimulator:
         y = 75
         cv2.putText(frame, f"On Belt: {len(self.chips)} chips", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
         y += 30
-        cv2.putText(frame, f"Total Value: {self.total_value} CR", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        cv2.putText(frame, f"Total Value: {self.ledger.total_value} CR", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         y += 30
-        cv2.putText(frame, f"Real Chips: {self.total_real}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        cv2.putText(frame, f"Real Chips: {self.ledger.real_count}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
         y += 30
-        cv2.putText(frame, f"Fake Chips: {self.total_fake}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        cv2.putText(frame, f"Fake Chips: {self.ledger.fake_count}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
         y += 30
-        cv2.putText(frame, f"Scanned: {len(self.session_chips)}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
+        cv2.putText(frame, f"Scanned: {self.ledger.count}", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
         
-        instructions = ["Controls:", "S - Spawn | B - Burst (5) | C - Clear", "P - Pause | R - Reset | Q - Quit"]
-        y = frame.shape[0] - 80
+        instructions = ["Controls:", "S - Spawn | B - Burst (5) | C - Clear", "P - Pause | R - Reset | Q - Quit",
+                        "I - Stage timings"]
+        y = frame.shape[0] - 105
         for instruction in instructions:
             cv2.putText(frame, instruction, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
             y += 25
     
-    def render_frame(self):
-        """Render current frame"""
-        frame = self.create_green_conveyor_background()
-        center_y = self.height // 2
-        cv2.line(frame, (self.belt_x, center_y), (self.belt_x + self.belt_width, center_y), (255, 255, 0), 3)
-        cv2.putText(frame, "SCAN LINE", (self.belt_x + 10, center_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-        
-        for chip in self.chips:
+    def render_frame(self, annotate=True):
+        """
+        Render current frame
+        
+        Args:
+            annotate: Draw scan line, chip labels and UI; False gives the bare
+                      belt a camera would see
+        """
+        profiler = self.profiler
+        with profiler.stage('background'):
+            frame = self.create_green_conveyor_background()
+        if annotate:
+            center_y = self.height // 2
+            cv2.line(frame, (self.belt_x, center_y), (self.belt_x + self.belt_width, center_y), (255, 255, 0), 3)
+            cv2.putText(frame, "SCAN LINE", (self.belt_x + 10, center_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+        
+        # All chips in view are composited in one batch, then annotated
+        with profiler.stage('composite'):
+            visible = self.chips.visible(self.height)
+            composite(frame, self.chips.sprites(visible),
+                      self.chips.column('x')[visible].astype(np.intp), self.chips.column('y')[visible].astype(np.intp))
+        if not annotate:
+            return frame
+        
+        with profiler.stage('draw'):
+            self.draw_labels(frame, visible)
+            self.draw_ui(frame)
+        return frame
+    
+    def draw_labels(self, frame, visible):
+        """Outline and label the first max_labels visible chips"""
+        for i in visible[:self.max_labels].tolist():
+            chip = self.chips[i]
             x, y = int(chip['x']), int(chip['y'])
-            self.overlay_image_alpha(frame, chip['template'], x, y)
             color = (0, 255, 0) if chip['authentic'] else (0, 0, 255)
             cv2.rectangle(frame, (x, y), (x + chip['width'], y + chip['height']), color, 2)
             
@@ -318,52 +344,182 @@ class ConveyorSimulator:
                 diff_pct = chip.get('difference', 0) * 100
                 status_text = f"FAKE ({diff_pct:.1f}%)" if not chip['authentic'] else f"REAL ({diff_pct:.1f}%)"
                 cv2.putText(frame, status_text, (x, y + chip['height'] + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+    
+    def handle_key(self, key):
+        """
+        Apply a control key (S, B, C, R); session replays feed recorded keys through here
         
-        self.draw_ui(frame)
-        return frame
+        Returns:
+            bool: True if the key changed the simulation
+        """
+        if key in (ord('s'), ord('S')): self.spawn_chip()
+        elif key in (ord('b'), ord('B')):
+            self.spawn_chips(5)
+            if self.verbose: print("💥 Burst spawned 5 chips!")
+        elif key in (ord('c'), ord('C')):
+            self.chips.clear()
+            if self.verbose: print("🧹 Cleared!")
+        elif key in (ord('r'), ord('R')):
+            self.ledger.reset()
+            if self.verbose: print("🔄 Reset!")
+        else:
+            return False
+        return True
     
-    def run(self):
-        """Main simulation loop"""
+    def run(self, record=None, profile_path=None):
+        """
+        Main simulation loop
+        
+        Args:
+            record: Path to record the session to (seed, spawns, keys, frame checkpoints)
+            profile_path: JSON file the stage timings are written to on exit
+        """
         print("\n🎬 Starting Intergalactic Riksbanken Chip Authenticator...")
-        print("Controls: S-Spawn | B-Burst(5) | C-Clear | P-Pause | R-Reset | Q-Quit\n")
+        print("Controls: S-Spawn | B-Burst(5) | C-Clear | P-Pause | R-Reset | I-Timings | Q-Quit\n")
+        if record:
+            self.recorder = SessionRecorder(record, self)
+            print(f"⏺️  Recording session to {record}")
         
         paused = False
+        pacer = FramePacer(target_fps=self.frame_rate)
+        profiler = self.profiler
         while True:
+            stepped = False
             if not paused:
-                self.frame_count += 1
-                self.update_chips()
-                if self.frame_count % self.spawn_interval == 0:
-                    self.spawn_chip()
-                    self.spawn_interval = random.randint(30, 60)
+                with profiler.stage('step'):
+                    self.step()
+                stepped = True
             
             frame = self.render_frame()
-            cv2.imshow("Chip Conveyor Simulator", frame)
-            key = cv2.waitKey(30) & 0xFF
+            if self.recorder and stepped and self.frame_count % CHECKPOINT_EVERY == 0:
+                with profiler.stage('record'):
+                    self.recorder.checkpoint(self.frame_count, frame)
+            # Stamped and drawn after the checkpoint, so recordings still replay bit for bit
+            if self.embed_markers:
+                encode_marker(frame, self.frame_count)
+            if profiler.enabled:
+                profiler.draw(frame, frame.shape[1] - 310, 10)
+            with profiler.stage('display'):
+                cv2.imshow("Chip Conveyor Simulator", frame)
+            with profiler.stage('wait'):
+                key = pacer.wait_key(changed=stepped)
+            profiler.end_frame()
             
             if key == ord('q') or key == ord('Q'): break
-            elif key == ord('s') or key == ord('S'): self.spawn_chip()
-            elif key == ord('b') or key == ord('B'):
-                for _ in range(5): self.spawn_chip()
-                print("💥 Burst spawned 5 chips!")
-            elif key == ord('c') or key == ord('C'): self.chips.clear(); print("🧹 Cleared!")
             elif key == ord('p') or key == ord('P'):
                 paused = not paused
                 print(f"\n{'⏸️  PAUSED' if paused else '▶️  RESUMED'}")
-                if paused: print(f"   Value: {self.total_value} CR | Real: {self.total_real} | Fake: {self.total_fake}")
-            elif key == ord('r') or key == ord('R'):
-                self.total_value = self.total_real = self.total_fake = 0
-                self.session_chips.clear()
-                print("🔄 Reset!")
+                if paused:
+                    ledger = self.ledger
+                    print(f"   Value: {ledger.total_value} CR | Real: {ledger.real_count} | Fake: {ledger.fake_count}")
+            elif key == ord('i') or key == ord('I'):
+                print(f"⏱️  Stage timings {'on' if profiler.toggle() else 'off'}")
+            elif self.handle_key(key) and self.recorder:
+                self.recorder.key(self.frame_count, key)
         
         cv2.destroyAllWindows()
+        if self.recorder:
+            self.recorder.end(self)
+            self.recorder.close()
+            print(f"💾 Session saved to {record} (replay: python session.py {record})")
         print(f"\n{'='*60}\nSESSION COMPLETE\n{'='*60}")
-        print(f"Total Chips: {len(self.session_chips)} | Real: {self.total_real} | Fake: {self.total_fake}")
-        print(f"Total Value: {self.total_value} CR")
-        if self.total_real > 0: print(f"Average: {self.total_value / self.total_real:.1f} CR")
+        ledger = self.ledger
+        ledger.close()
+        print(f"Total Chips: {ledger.count} | Real: {ledger.real_count} | Fake: {ledger.fake_count}")
+        print(f"Total Value: {ledger.total_value} CR")
+        if ledger.real_count > 0: print(f"Average: {ledger.total_value / ledger.real_count:.1f} CR")
+        ledger.print_summary()
+        pacer.print_stats()
+        profiler.dump(profile_path)
         print("="*60)
+    
+    def run_headless(self, frames=None, seconds=None, render=True):
+        """
+        Step the simulation without a window, as fast as the CPU allows.
+        
+        Args:
+            frames: Number of frames to simulate
+            seconds: Simulated time to run, converted with frame_rate
+            render: Render a frame per step (None is yielded when False)
+            
+        Yields:
+            tuple: (frame, events) where events lists chips scanned in that step
+        """
+        if frames is None and seconds is None:
+            raise ValueError("run_headless needs frames or seconds")
+        if seconds is not None:
+            seconds_frames = int(round(seconds * self.frame_rate))
+            frames = seconds_frames if frames is None else min(frames, seconds_frames)
+        
+        profiler = self.profiler
+        for _ in range(frames):
+            with profiler.stage('step'):
+                events = self.step()
+            frame = self.render_frame() if render else None
+            if self.recorder and frame is not None and self.frame_count % CHECKPOINT_EVERY == 0:
+                with profiler.stage('record'):
+                    self.recorder.checkpoint(self.frame_count, frame)
+            profiler.end_frame()
+            yield frame, events
+
+
+def run_benchmark(frames=None, seconds=None, render=True, seed=None, record=None, ledger_dir=None,
+                  profile=False, profile_path=None):
+    """Run the simulator headless and report throughput (optionally recording the session and stage timings)"""
+    sim = ConveyorSimulator(width=1280, height=720, conveyor_speed=3, seed=seed, ledger_dir=ledger_dir,
+                            profile=profile or profile_path is not None)
+    if record:
+        sim.verbose = False
+        sim.recorder = SessionRecorder(record, sim)
+    count = 0
+    scanned = 0
+    start = time.perf_counter()
+    for _, events in sim.run_headless(frames=frames, seconds=seconds, render=render):
+        count += 1
+        scanned += len(events)
+    elapsed = time.perf_counter() - start
+    if record:
+        sim.recorder.end(sim)
+        sim.recorder.close()
+    
+    print(f"\n{'='*60}\nHEADLESS RUN COMPLETE\n{'='*60}")
+    print(f"Frames: {count} | Sim time: {count / sim.frame_rate:.1f}s | Wall time: {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"Throughput: {count / elapsed:.1f} FPS ({count / elapsed / sim.frame_rate:.1f}x real time)")
+    ledger = sim.ledger
+    ledger.close()
+    print(f"Scanned: {scanned} | Real: {ledger.real_count} | Fake: {ledger.fake_count} | Value: {ledger.total_value} CR")
+    print(f"Seed: {sim.seed}" + (f" | Session saved to {record}" if record else ""))
+    sim.profiler.dump(profile_path)
+    print("="*60)
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Chip conveyor simulator")
+    parser.add_argument('--headless', action='store_true', help="Run without a window at maximum speed")
+    parser.add_argument('--frames', type=int, help="Frames to simulate in headless mode")
+    parser.add_argument('--seconds', type=float, help="Simulated seconds to run in headless mode")
+    parser.add_argument('--no-render', action='store_true', help="Skip frame rendering in headless mode")
+    parser.add_argument('--seed', type=int, help="Session seed (random when omitted)")
+    parser.add_argument('--record', metavar='PATH', help="Record the session for replay with session.py")
+    parser.add_argument('--ledger-dir', help="Directory for the scanned-chip ledger "
+                                             "(default: ledger/ for windowed runs, none in headless mode)")
+    parser.add_argument('--profile', action='store_true', help="Time each loop stage (p50/p95/p99 on the HUD and at exit)")
+    parser.add_argument('--profile-out', metavar='PATH', help="Write the stage timings to a JSON file on exit")
+    parser.add_argument('--markers', action='store_true',
+                        help="Stamp frame markers for latency measurement by the camera pipeline")
+    args = parser.parse_args()
+    
+    if args.headless:
+        if args.frames is None and args.seconds is None:
+            args.frames = 1000
+        run_benchmark(frames=args.frames, seconds=args.seconds, render=not args.no_render,
+                      seed=args.seed, record=args.record, ledger_dir=args.ledger_dir,
+                      profile=args.profile, profile_path=args.profile_out)
+        raise SystemExit(0)
+    
     print("="*60)
     print("🎬 CHIP CONVEYOR SIMULATOR")
     print("="*60)
@@ -373,4 +529,7 @@ if __name__ == "__main__":
     print("  BRONZE: 2 digits × ×   (e.g., 2×4 → 8 CR)")
     print("="*60 + "\n")
     
-    ConveyorSimulator(width=1280, height=720, conveyor_speed=3).run()
+    sim = ConveyorSimulator(width=1280, height=720, conveyor_speed=3, seed=args.seed,
+                            ledger_dir=args.ledger_dir or 'ledger', profile=args.profile or args.profile_out is not None,
+                            embed_markers=args.markers)
+    sim.run(record=args.record, profile_path=args.profile_out)
@@ -0,0 +1,262 @@
+"""
+Frame Markers
+Machine-readable frame counter and timestamp stamped into simulator frames,
+decoded by the camera pipeline to measure glass-to-glass latency and frame loss
+"""
+
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+
+# 32-bit frame counter, 32-bit microsecond timestamp and an 8-bit check, in 2 rows of 36 cells
+COUNTER_BITS = 32
+STAMP_BITS = 32
+CHECK_BITS = 8
+ROWS, COLS = 2, 36
+CELL = 8  # Cell size in px; large enough to survive webcam scaling and compression
+MARGIN = 8  # Distance from the bottom-left corner of the frame
+
+# Dark levels outside every chip colour range, so the strip is never detected as a chip
+OFF_LEVEL = 0
+ON_LEVEL = 96
+
+STAMP_MASK = (1 << STAMP_BITS) - 1
+COUNTER_MASK = (1 << COUNTER_BITS) - 1
+
+
+def now_us():
+    """Monotonic clock in microseconds, wrapped to the marker's timestamp width"""
+    return (time.monotonic_ns() // 1000) & STAMP_MASK
+
+
+def age_ms(stamp_us, now=None):
+    """Milliseconds since a marker timestamp, allowing for wrap-around"""
+    return (((now_us() if now is None else now) - stamp_us) & STAMP_MASK) / 1000
+
+
+def marker_rect(frame_shape):
+    """(x, y, w, h) of the marker strip for a frame shape"""
+    height = frame_shape[0]
+    return MARGIN, height - MARGIN - ROWS * CELL, COLS * CELL, ROWS * CELL
+
+
+def _check(counter, stamp_us):
+    return zlib.crc32(counter.to_bytes(4, 'little') + stamp_us.to_bytes(4, 'little')) & 0xFF
+
+
+def encode_marker(frame, counter, stamp_us=None):
+    """
+    Stamp a marker into the bottom-left corner of a frame, in place
+
+    Args:
+        frame: BGR image
+        counter: Frame number (wrapped to 32 bits)
+        stamp_us: Timestamp from now_us() (taken now when None)
+
+    Returns:
+        int: The timestamp written
+    """
+    counter &= COUNTER_MASK
+    if stamp_us is None:
+        stamp_us = now_us()
+    value = counter | stamp_us << COUNTER_BITS | _check(counter, stamp_us) << (COUNTER_BITS + STAMP_BITS)
+    bits = np.array([value >> i & 1 for i in range(ROWS * COLS)], dtype=bool)
+    cells = np.where(bits, ON_LEVEL, OFF_LEVEL).astype(np.uint8).reshape(ROWS, COLS)
+
+    x, y, w, h = marker_rect(frame.shape)
+    frame[y:y + h, x:x + w] = np.kron(cells, np.ones((CELL, CELL), np.uint8))[:, :, None]
+    return stamp_us
+
+
+def decode_marker(frame):
+    """
+    Read the marker from a frame
+
+    Returns:
+        tuple: (counter, stamp_us), or None when the frame carries no valid marker
+    """
+    x, y, w, h = marker_rect(frame.shape)
+    if y < 0 or x + w > frame.shape[1]:
+        return None
+
+    # Sample the centre of every cell
+    ys = y + CELL // 2 + CELL * np.arange(ROWS)
+    xs = x + CELL // 2 + CELL * np.arange(COLS)
+    samples = frame[ys[:, None], xs[None, :]]
+    if samples.ndim == 3:
+        samples = samples.mean(axis=2)
+    # Every cell must sit near one of the two levels; anything else is scene content
+    threshold = (OFF_LEVEL + ON_LEVEL) / 2
+    if (np.abs(samples - np.where(samples > threshold, ON_LEVEL, OFF_LEVEL)) > threshold / 2).any():
+        return None
+    bits = (samples.reshape(-1) > threshold).tolist()
+
+    value = 0
+    for i, bit in enumerate(bits):
+        value |= bit << i
+    counter = value & COUNTER_MASK
+    stamp_us = value >> COUNTER_BITS & STAMP_MASK
+    if value >> (COUNTER_BITS + STAMP_BITS) != _check(counter, stamp_us):
+        return None
+    return counter, stamp_us
+
+
+class LatencyMonitor:
+    """
+    Latency and frame loss of a marked frame source, as seen by a processing loop.
+
+    observe() decodes each frame as it enters processing; shown() marks the
+    moment its results are on screen. Latencies are measured from the
+    marker's timestamp, so they include everything upstream of the loop
+    (rendering, a virtual camera, capture queues).
+    """
+
+    STAGES = ('capture', 'display', 'scan')
+
+    def __init__(self, history=600):
+        """
+        Initialize monitor
+
+        Args:
+            history: Samples kept per stage for the percentiles
+        """
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self.samples = {stage: deque(maxlen=self.history) for stage in self.STAGES}
+        self.frames = 0
+        self.decoded = 0
+        self.lost = 0
+        self.repeated = 0
+        self.last_counter = None
+        self.pending = None
+
+    def observe(self, frame):
+        """
+        Decode the marker of a frame entering the pipeline
+
+        Returns:
+            tuple: (counter, stamp_us), or None for unmarked frames
+        """
+        self.frames += 1
+        marker = decode_marker(frame)
+        self.pending = marker
+        if marker is None:
+            return None
+
+        counter, stamp_us = marker
+        self.decoded += 1
+        self.samples['capture'].append(age_ms(stamp_us))
+        if self.last_counter is not None:
+            gap = (counter - self.last_counter) & COUNTER_MASK
+            if gap == 0:
+                self.repeated += 1
+            elif gap < 1 << (COUNTER_BITS - 1):
+                self.lost += gap - 1
+            # A counter that went backwards is a restarted source, not loss
+        self.last_counter = counter
+        return marker
+
+    def shown(self, committed=False):
+        """
+        Record that the last observed frame's results are on screen
+
+        Args:
+            committed: The frame counted chips crossing the scan line, so this
+                       is also a scan-line-to-HUD latency sample
+        """
+        if self.pending is None:
+            return
+        latency = age_ms(self.pending[1])
+        self.samples['display'].append(latency)
+        if committed:
+            self.samples['scan'].append(latency)
+        self.pending = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: frames, decoded, lost, repeated, and per stage
+                  {'p50', 'p95', 'p99', 'max'} in ms (stages without samples are left out)
+        """
+        stats = {'frames': self.frames, 'decoded': self.decoded, 'lost': self.lost, 'repeated': self.repeated}
+        for stage, values in self.samples.items():
+            if values:
+                p50, p95, p99 = np.percentile(values, (50, 95, 99))
+                stats[stage] = {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(max(values))}
+        return stats
+
+    def hud_text(self):
+        """One-line HUD summary, or None before the first marked frame"""
+        if not self.samples['display']:
+            return None
+        p50, p95 = np.percentile(self.samples['display'], (50, 95))
+        return f"Latency: {p50:.0f}/{p95:.0f} ms p50/p95 | Lost: {self.lost}"
+
+    def print_stats(self, dropped=None):
+        """
+        Print latency and loss
+
+        Args:
+            dropped: Frames the capture queue dropped on purpose, so the rest
+                     of the loss can be put down to the source
+        """
+        stats = self.stats()
+        if not self.decoded:
+            return
+        print(f"   Markers: {self.decoded}/{self.frames} frames decoded | {self.lost} lost | "
+              f"{self.repeated} repeated")
+        if dropped is not None:
+            print(f"   Lost in capture queue: {dropped} | before capture: {max(0, self.lost - dropped)}")
+        labels = {'capture': 'Marker to pipeline', 'display': 'Marker to screen', 'scan': 'Scan line to HUD'}
+        for stage in self.STAGES:
+            if stage in stats:
+                s = stats[stage]
+                print(f"   {labels[stage]}: p50 {s['p50']:.1f} ms | p95 {s['p95']:.1f} ms | "
+                      f"p99 {s['p99']:.1f} ms | max {s['max']:.1f} ms")
+
+
+def measure_in_process(frames=300, seed=0):
+    """
+    Run virtual camera frames straight through the camera pipeline and report latency
+
+    Args:
+        frames: Marked frames to process
+        seed: Simulator seed
+
+    Returns:
+        dict: LatencyMonitor.stats()
+    """
+    from camera_main import CameraChipSystem
+    from virtual_camera import VirtualCamera
+
+    camera = VirtualCamera(seed=seed, realtime=False, embed_markers=True)
+    system = CameraChipSystem(camera=camera, threaded_capture=False, ledger_dir=None)
+
+    for _ in range(frames):
+        success, frame = camera.read_frame()
+        if not success:
+            break
+        system.latency.observe(frame)
+        frame, crossed = system.process_frame(frame)
+        system.draw_stats(frame)
+        system.latency.shown(committed=bool(crossed))
+    camera.release()
+
+    print(f"\n⏱️  In-process latency over {frames} frames")
+    system.latency.print_stats()
+    return system.latency.stats()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure simulator-to-screen latency with frame markers")
+    parser.add_argument('--frames', type=int, default=300, help="Marked frames to process")
+    parser.add_argument('--seed', type=int, default=0, help="Simulator seed")
+    args = parser.parse_args()
+
+    measure_in_process(args.frames, args.seed)
@@ -0,0 +1,151 @@
+"""
+Chip Digit OCR
+Batched glyph-template digit reading for chip ROIs
+"""
+
+import cv2
+import numpy as np
+
+
+class DigitReader:
+    """Read the digit row of many chips at once by correlating against a glyph bank"""
+
+    FONTS = (cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX, cv2.FONT_HERSHEY_PLAIN)
+
+    def __init__(self, n_digits=3, band=(0.1, 0.1, 0.9, 0.4), cell_size=(16, 24), max_shift=2,
+                 glyph_heights=(0.55, 0.7, 0.85)):
+        """
+        Initialize reader
+
+        Args:
+            n_digits: Digits in a row
+            band: (x0, y0, x1, y1) of the digit row as fractions of the chip ROI
+            cell_size: (width, height) each digit cell is normalised to
+            max_shift: Glyph bank covers offsets up to this many px in each direction
+            glyph_heights: Glyph heights in the bank, as fractions of the cell height
+        """
+        self.n_digits = n_digits
+        self.band = band
+        self.cell_w, self.cell_h = cell_size
+        self.max_shift = max_shift
+        self.glyph_heights = glyph_heights
+        self.build_glyph_bank()
+
+    def build_glyph_bank(self):
+        """Render digits 0-9 in several fonts, weights, sizes and offsets as unit vectors"""
+        glyphs = []
+        labels = []
+        scale_up = 4
+        for digit in range(10):
+            for font in self.FONTS:
+                for thickness in (1, 2):
+                    for height in self.glyph_heights:
+                        glyph = self.render_glyph(str(digit), font, thickness, scale_up, height)
+                        for dy in range(-self.max_shift, self.max_shift + 1):
+                            for dx in range(-self.max_shift, self.max_shift + 1):
+                                shift = np.float32([[1, 0, dx], [0, 1, dy]])
+                                glyphs.append(cv2.warpAffine(glyph, shift, (self.cell_w, self.cell_h)))
+                                labels.append(digit)
+
+        self.glyph_labels = np.array(labels)
+        self.glyph_bank = _normalise(np.stack(glyphs).reshape(len(glyphs), -1))
+
+    def render_glyph(self, text, font, thickness, scale_up, height=0.7):
+        """Draw one digit large, then fit it to a cell the way chip cells are fitted"""
+        size = (self.cell_w * scale_up, self.cell_h * scale_up)
+        canvas = np.zeros((size[1], size[0]), dtype=np.uint8)
+        font_scale = cv2.getFontScaleFromHeight(font, int(size[1] * height), thickness * scale_up)
+        (tw, th), _ = cv2.getTextSize(text, font, font_scale, thickness * scale_up)
+        origin = ((size[0] - tw) // 2, (size[1] + th) // 2)
+        cv2.putText(canvas, text, origin, font, font_scale, 255, thickness * scale_up, cv2.LINE_AA)
+        return cv2.resize(canvas, (self.cell_w, self.cell_h), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def extract_cells(self, rois):
+        """
+        Cut every ROI's digit row into normalised, bright-on-dark cells
+
+        Args:
+            rois: List of BGR or grayscale chip images
+
+        Returns:
+            np.ndarray: (len(rois) * n_digits, cell pixels) float32
+        """
+        row_w = self.cell_w * self.n_digits
+        rows = np.zeros((len(rois), self.cell_h, row_w), dtype=np.float32)
+        x0, y0, x1, y1 = self.band
+
+        for i, roi in enumerate(rois):
+            if roi.ndim == 3:
+                roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+            h, w = roi.shape
+            band = roi[int(y0 * h):max(int(y1 * h), int(y0 * h) + 1), int(x0 * w):max(int(x1 * w), int(x0 * w) + 1)]
+            if band.size:
+                rows[i] = cv2.resize(band, (row_w, self.cell_h), interpolation=cv2.INTER_AREA)
+
+        cells = rows.reshape(len(rois), self.cell_h, self.n_digits, self.cell_w).transpose(0, 2, 1, 3)
+        cells = cells.reshape(-1, self.cell_h, self.cell_w)
+
+        # Dark-on-light cells are inverted so every cell matches the bright-on-dark bank
+        border = np.concatenate([cells[:, 0], cells[:, -1], cells[:, :, 0], cells[:, :, -1]], axis=1)
+        flip = border.mean(axis=1) > cells.mean(axis=(1, 2))
+        cells[flip] = 255 - cells[flip]
+
+        return cells.reshape(len(cells), -1)
+
+    def read_batch(self, rois):
+        """
+        Read the digits of a batch of chips in one correlation
+
+        Args:
+            rois: List of chip images
+
+        Returns:
+            list: (digits, confidences) per ROI, each a tuple of n_digits;
+                  confidence is the margin of the best digit over the runner-up
+                  (see digit_confidence)
+        """
+        if not rois:
+            return []
+
+        cells = _normalise(self.extract_cells(rois))
+        scores = cells @ self.glyph_bank.T
+
+        # Best variant per digit class (the bank is grouped by digit), then best class per cell
+        per_digit = scores.reshape(len(cells), 10, -1).max(axis=2)
+        digits = per_digit.argmax(axis=1)
+        confidences = digit_confidence(per_digit)
+
+        digits = digits.reshape(len(rois), self.n_digits)
+        confidences = confidences.reshape(len(rois), self.n_digits)
+        return [(tuple(int(d) for d in row_digits), tuple(float(c) for c in row_conf))
+                for row_digits, row_conf in zip(digits, confidences)]
+
+    def read(self, roi):
+        """Read one chip; see read_batch"""
+        return self.read_batch([roi])[0]
+
+
+def digit_confidence(per_digit):
+    """
+    Confidence of each cell's best digit from its per-digit correlations
+
+    The best correlation's lead over the runner-up, as a fraction of the
+    runner-up's distance from a perfect match. A cell that fits two digits
+    about equally well (a smudged 3 or 8) scores near 0 however well it
+    fits either of them.
+
+    Args:
+        per_digit: (cells, 10) best correlation per digit class
+
+    Returns:
+        np.ndarray: Confidence in [0, 1] per cell
+    """
+    runner_up, best = np.sort(per_digit, axis=1)[:, -2:].T
+    return np.clip((best - runner_up) / np.maximum(1 - runner_up, 1e-6), 0, 1)
+
+
+def _normalise(vectors):
+    """Zero-mean, unit-length rows so a dot product is a normalised correlation"""
+    vectors = vectors - vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
@@ -0,0 +1,131 @@
+"""
+Frame Pacing
+Deadline-based frame scheduling for the OpenCV display loops
+"""
+
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class FramePacer:
+    """
+    Hold a display loop to a target frame rate without spinning.
+
+    Each call to wait_key() sleeps in cv2.waitKey until the next frame's
+    deadline, so keys still wake the loop at once. When the caller reports no
+    change for idle_after seconds, the deadline spacing stretches to the idle
+    rate until something changes or a key is pressed.
+    """
+
+    def __init__(self, target_fps=30, idle_fps=4, idle_after=0.5, history=120, wait=None):
+        """
+        Initialize pacer
+
+        Args:
+            target_fps: Frame rate while the scene changes
+            idle_fps: Frame rate once nothing has changed for idle_after seconds
+            idle_after: Seconds without change before idling
+            history: Frames kept for the timing statistics
+            wait: Key wait function taking milliseconds (cv2.waitKey when None)
+        """
+        self.period = 1.0 / target_fps
+        self.idle_period = 1.0 / idle_fps
+        self.idle_after = idle_after
+        self.wait = wait or cv2.waitKey
+
+        self.deadline = None
+        self.last_tick = None
+        self.last_change = time.perf_counter()
+        self.idle = False
+
+        self.intervals = deque(maxlen=history)
+        self.lateness = deque(maxlen=history)
+        self.busy = deque(maxlen=history)
+        self.idle_frames = 0
+        self.frames = 0
+
+    def wait_key(self, changed=True):
+        """
+        Sleep until the next frame is due, returning early on a key press
+
+        Args:
+            changed: Whether this frame showed anything new
+
+        Returns:
+            int: Key code (& 0xFF), 255 when no key was pressed
+        """
+        now = time.perf_counter()
+        if changed:
+            self.last_change = now
+        self.idle = now - self.last_change >= self.idle_after
+        period = self.idle_period if self.idle else self.period
+
+        if self.deadline is None:
+            self.deadline = now + period
+        else:
+            self.deadline += period
+            # After a stall, restart the schedule instead of rushing to catch up
+            if self.deadline < now - period:
+                self.deadline = now + period
+
+        if self.last_tick is not None:
+            self.busy.append(now - self.last_tick)
+
+        key = 255
+        remaining = self.deadline - now
+        while remaining > 0:
+            key = self.wait(max(1, int(remaining * 1000))) & 0xFF
+            if key != 255:
+                # Input wakes the loop and ends idling; the schedule restarts from here
+                self.last_change = time.perf_counter()
+                self.deadline = self.last_change
+                break
+            remaining = self.deadline - time.perf_counter()
+        else:
+            # Late frames still poll the keyboard once
+            key = self.wait(1) & 0xFF
+            if key != 255:
+                self.last_change = time.perf_counter()
+
+        tick = time.perf_counter()
+        if self.last_tick is not None:
+            self.intervals.append(tick - self.last_tick)
+            self.lateness.append(max(0.0, tick - self.deadline))
+        self.last_tick = tick
+        self.frames += 1
+        self.idle_frames += self.idle
+        return key
+
+    def stats(self):
+        """
+        Timing over the recent history
+
+        Returns:
+            dict: fps (frames / elapsed time), interval and jitter (standard
+                  deviation of the frame interval) in ms, p95 lateness past the
+                  deadline in ms, load (fraction of each interval spent working)
+                  and idle (fraction of all frames paced at the idle rate)
+        """
+        if not self.intervals:
+            return {'fps': 0.0, 'interval_ms': 0.0, 'jitter_ms': 0.0, 'late_p95_ms': 0.0,
+                    'load': 0.0, 'idle': 0.0}
+        intervals = np.array(self.intervals)
+        busy = np.array(self.busy)[-len(intervals):]
+        return {
+            'fps': float(len(intervals) / intervals.sum()),
+            'interval_ms': float(intervals.mean() * 1000),
+            'jitter_ms': float(intervals.std() * 1000),
+            'late_p95_ms': float(np.percentile(self.lateness, 95) * 1000),
+            'load': float(busy.sum() / intervals.sum()),
+            'idle': self.idle_frames / self.frames
+        }
+
+    def print_stats(self):
+        """Print a one-line pacing summary"""
+        stats = self.stats()
+        print(f"   Pacing: {stats['fps']:.1f} FPS (target {1 / self.period:.0f}) | "
+              f"jitter {stats['jitter_ms']:.1f} ms | p95 late {stats['late_p95_ms']:.1f} ms | "
+              f"load {stats['load'] * 100:.0f}% | idle {stats['idle'] * 100:.0f}% of frames")
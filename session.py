@@ -0,0 +1,210 @@
+"""
+Simulator Sessions
+Compact binary recording of seeded simulator sessions and headless replay
+"""
+
+import io
+import struct
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b'IRCS'
+VERSION = 1
+
+# Header: magic, version, seed, width, height, conveyor speed, frame rate
+HEADER = struct.Struct('<4sHQHHff')
+
+# Every event is one fixed-size record: frame, kind, arg, then three words and a float
+RECORD = struct.Struct('<IBBHIIIf')
+RECORD_DTYPE = np.dtype([('frame', '<u4'), ('kind', 'u1'), ('arg', 'u1'), ('pad', '<u2'),
+                         ('a', '<u4'), ('b', '<u4'), ('c', '<u4'), ('d', '<f4')])
+
+EVENT_SPAWN = 1       # arg: chip type index, a: chip id, b: x, c: value, d: difference
+EVENT_KEY = 2         # arg: key code (applied after the frame's step)
+EVENT_CHECKPOINT = 3  # a: CRC32 of the rendered frame
+EVENT_END = 4         # a: real, b: fake, c: total value
+
+CHECKPOINT_EVERY = 30
+
+
+class SessionRecorder:
+    """Append simulator events to a binary session log"""
+
+    def __init__(self, path, sim, flush_every=4096):
+        """
+        Open a log and write its header
+
+        Args:
+            path: Output file (or a writable binary file object)
+            sim: ConveyorSimulator being recorded; its seed goes in the header
+            flush_every: Records buffered before a write
+        """
+        self.file = open(path, 'wb') if isinstance(path, str) else path
+        self.file.write(HEADER.pack(MAGIC, VERSION, sim.seed, sim.width, sim.height,
+                                    sim.conveyor_speed, sim.frame_rate))
+        self.buffer = []
+        self.flush_every = flush_every
+        self.records = 0
+
+    def record(self, frame, kind, arg=0, a=0, b=0, c=0, d=0.0):
+        """Buffer one event"""
+        self.buffer.append(RECORD.pack(frame, kind, arg, 0, a, b, c, d))
+        self.records += 1
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def spawn(self, frame, type_index, chip_id, x, value, difference):
+        self.record(frame, EVENT_SPAWN, type_index, chip_id, x, value, difference)
+
+    def key(self, frame, key):
+        self.record(frame, EVENT_KEY, key)
+
+    def checkpoint(self, frame, image):
+        self.record(frame, EVENT_CHECKPOINT, a=zlib.crc32(image))
+
+    def end(self, sim):
+        ledger = sim.ledger
+        self.record(sim.frame_count, EVENT_END, a=ledger.real_count, b=ledger.fake_count, c=ledger.total_value)
+
+    def flush(self):
+        """Write buffered records"""
+        if self.buffer:
+            self.file.write(b''.join(self.buffer))
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def load_session(path):
+    """
+    Read a session log
+
+    Returns:
+        tuple: (header dict, structured array of events)
+    """
+    with open(path, 'rb') as f:
+        return parse_session(f.read(), path)
+
+
+def parse_session(data, name='session'):
+    """Parse session log bytes; see load_session"""
+    magic, version, seed, width, height, speed, frame_rate = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{name} is not a session log")
+    if version != VERSION:
+        raise ValueError(f"Unsupported session log version {version}")
+
+    usable = (len(data) - HEADER.size) // RECORD.size * RECORD.size
+    events = np.frombuffer(data, dtype=RECORD_DTYPE, count=usable // RECORD.size, offset=HEADER.size)
+    header = {'seed': seed, 'width': width, 'height': height, 'conveyor_speed': speed, 'frame_rate': frame_rate}
+    return header, events
+
+
+def replay(path, render=False, verify=True):
+    """
+    Reproduce a recorded session headlessly at maximum speed
+
+    The simulator is rebuilt from the header seed and stepped frame by frame;
+    only keypresses are fed back in, everything else comes from the seed.
+    Spawns are compared against the log, and with render=True every
+    checkpointed frame is compared by CRC.
+
+    Args:
+        path: Session log
+        render: Render frames (needed to check frame checkpoints)
+        verify: Compare spawns, checkpoints and totals against the log
+
+    Returns:
+        dict: frames, wall seconds, totals and the mismatches found
+    """
+    from main import ConveyorSimulator
+
+    header, events = load_session(path)
+    sim = ConveyorSimulator(width=header['width'], height=header['height'],
+                            conveyor_speed=header['conveyor_speed'], frame_rate=header['frame_rate'],
+                            seed=header['seed'])
+    sim.verbose = False
+
+    keys = events[events['kind'] == EVENT_KEY]
+    checkpoints = {int(e['frame']): int(e['a']) for e in events[events['kind'] == EVENT_CHECKPOINT]}
+    end = events[events['kind'] == EVENT_END]
+    last_frame = int(end['frame'][-1]) if len(end) else int(events['frame'].max(initial=0))
+
+    # The replay records itself in memory so its spawns can be compared record for record
+    replayed = io.BytesIO()
+    sim.recorder = SessionRecorder(replayed, sim)
+
+    mismatches = []
+    key_index = 0
+    # Keys pressed before the first step were recorded at frame 0
+    while key_index < len(keys) and keys['frame'][key_index] == 0:
+        sim.handle_key(int(keys['arg'][key_index]))
+        key_index += 1
+
+    start = time.perf_counter()
+    while sim.frame_count < last_frame:
+        sim.step()
+        frame = sim.frame_count
+        if render:
+            image = sim.render_frame()
+            if verify and frame in checkpoints and zlib.crc32(image) != checkpoints[frame]:
+                mismatches.append(f"frame {frame}: image differs")
+        while key_index < len(keys) and keys['frame'][key_index] == frame:
+            sim.handle_key(int(keys['arg'][key_index]))
+            key_index += 1
+    elapsed = time.perf_counter() - start
+
+    sim.recorder.flush()
+    _, replayed_events = parse_session(replayed.getvalue())
+    spawned = replayed_events[replayed_events['kind'] == EVENT_SPAWN]
+
+    if verify:
+        recorded = events[events['kind'] == EVENT_SPAWN]
+        if len(spawned) != len(recorded):
+            mismatches.append(f"{len(spawned)} spawns replayed, {len(recorded)} recorded")
+        else:
+            differs = np.flatnonzero(spawned != recorded)
+            if differs.size:
+                mismatches.append(f"spawn {differs[0]} differs (frame {recorded['frame'][differs[0]]})")
+        if len(end):
+            totals = (int(end['a'][-1]), int(end['b'][-1]), int(end['c'][-1]))
+            replayed_totals = (sim.ledger.real_count, sim.ledger.fake_count, sim.ledger.total_value)
+            if totals != replayed_totals:
+                mismatches.append(f"totals {totals} recorded, {replayed_totals} replayed")
+
+    return {'frames': sim.frame_count, 'seconds': elapsed, 'real': sim.ledger.real_count,
+            'fake': sim.ledger.fake_count, 'value': sim.ledger.total_value, 'spawns': len(spawned),
+            'mismatches': mismatches}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded simulator session")
+    parser.add_argument('session', help="Session log written by main.py --record")
+    parser.add_argument('--render', action='store_true', help="Render frames and check frame checkpoints")
+    parser.add_argument('--no-verify', action='store_true', help="Replay without checking against the log")
+    args = parser.parse_args()
+
+    result = replay(args.session, render=args.render, verify=not args.no_verify)
+    print(f"\n{'='*60}\nREPLAY COMPLETE\n{'='*60}")
+    print(f"Frames: {result['frames']} | Wall time: {result['seconds']:.2f}s", end='')
+    if result['seconds'] > 0:
+        print(f" | {result['frames'] / result['seconds']:.0f} FPS")
+    else:
+        print()
+    print(f"Spawns: {result['spawns']} | Real: {result['real']} | Fake: {result['fake']} | Value: {result['value']} CR")
+    if args.no_verify:
+        pass
+    elif result['mismatches']:
+        print(f"❌ {len(result['mismatches'])} mismatches:")
+        for mismatch in result['mismatches'][:10]:
+            print(f"   {mismatch}")
+    else:
+        print("✅ Replay matches the recording")
+    print("="*60)
@@ -0,0 +1,311 @@
+"""
+Chip Sprites
+Premultiplied-alpha chip images with fixed-point blending
+"""
+
+import numpy as np
+
+
+class Sprite:
+    """Chip image converted once for fast alpha blending onto BGR frames"""
+
+    def __init__(self, image):
+        """
+        Convert a BGR or BGRA image into a sprite
+
+        Args:
+            image: BGR or BGRA uint8 image
+        """
+        self.height, self.width = image.shape[:2]
+
+        if image.ndim == 3 and image.shape[2] == 4:
+            alpha = image[:, :, 3]
+        else:
+            alpha = np.full((self.height, self.width), 255, dtype=np.uint8)
+        color = image[:, :, :3]
+
+        # Fully transparent border rows/columns are cropped away and never touched
+        rows = np.flatnonzero(alpha.any(axis=1))
+        cols = np.flatnonzero(alpha.any(axis=0))
+        if rows.size == 0:
+            self.offset_x = self.offset_y = 0
+            self.crop_h = self.crop_w = 0
+            self.core = None
+            return
+
+        self.offset_y, self.offset_x = int(rows[0]), int(cols[0])
+        alpha = alpha[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        self.color = np.ascontiguousarray(color[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1])
+        self.crop_h, self.crop_w = alpha.shape
+
+        # Fully opaque pixels are copied straight through without blending
+        self.opaque = np.repeat((alpha == 255)[:, :, None], 3, axis=2)
+        self.solid = bool(self.opaque.all())
+
+        # Only partially transparent pixels are blended, with premultiplied colour
+        self.soft_rows, self.soft_cols = np.nonzero((alpha > 0) & (alpha < 255))
+        soft_alpha = alpha[self.soft_rows, self.soft_cols].astype(np.uint16)[:, None]
+        soft_color = self.color[self.soft_rows, self.soft_cols].astype(np.uint16)
+        self.soft_premultiplied = _div255(soft_color * soft_alpha)
+        self.soft_inv_alpha = 255 - soft_alpha
+        self._dense = None
+        
+        # Largest fully opaque rectangle, used to cull chips hidden behind this one
+        self.core = _largest_rectangle(self.opaque[:, :, 0])
+
+    ARRAYS = ('color', 'opaque', 'soft_rows', 'soft_cols', 'soft_premultiplied', 'soft_inv_alpha')
+
+    def to_arrays(self):
+        """Everything the sprite derived from its image, as named arrays (for caching)"""
+        core = self.core if self.core is not None else (-1, -1, -1, -1)
+        arrays = {'geometry': np.array([self.height, self.width, self.offset_y, self.offset_x,
+                                        self.crop_h, self.crop_w, *core], dtype=np.int64)}
+        if self.crop_h:
+            arrays.update({name: getattr(self, name) for name in self.ARRAYS})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a sprite from to_arrays() output without redoing the conversion"""
+        sprite = cls.__new__(cls)
+        geometry = [int(v) for v in arrays['geometry']]
+        sprite.height, sprite.width, sprite.offset_y, sprite.offset_x, sprite.crop_h, sprite.crop_w = geometry[:6]
+        sprite.core = tuple(geometry[6:]) if geometry[6] >= 0 else None
+        if sprite.crop_h:
+            for name in cls.ARRAYS:
+                setattr(sprite, name, arrays[name])
+            sprite.solid = bool(sprite.opaque.all())
+            sprite._dense = None
+        return sprite
+
+    def blit(self, background, x, y):
+        """
+        Blend sprite onto background in place, clipped to the frame
+
+        Args:
+            background: BGR uint8 frame
+            x, y: Top-left position of the full (uncropped) sprite
+        """
+        bh, bw = background.shape[:2]
+        x0 = x + self.offset_x
+        y0 = y + self.offset_y
+
+        # Visible rectangle in crop coordinates
+        r0 = max(0, -y0)
+        c0 = max(0, -x0)
+        r1 = min(self.crop_h, bh - y0)
+        c1 = min(self.crop_w, bw - x0)
+        if r1 <= r0 or c1 <= c0:
+            return
+
+        dst = background[y0 + r0:y0 + r1, x0 + c0:x0 + c1]
+        if self.solid:
+            dst[:] = self.color[r0:r1, c0:c1]
+            return
+        np.copyto(dst, self.color[r0:r1, c0:c1], where=self.opaque[r0:r1, c0:c1])
+
+        rows, cols = self.soft_rows, self.soft_cols
+        premultiplied, inv_alpha = self.soft_premultiplied, self.soft_inv_alpha
+        if r0 > 0 or c0 > 0 or r1 < self.crop_h or c1 < self.crop_w:
+            keep = (rows >= r0) & (rows < r1) & (cols >= c0) & (cols < c1)
+            rows, cols = rows[keep], cols[keep]
+            premultiplied, inv_alpha = premultiplied[keep], inv_alpha[keep]
+        if rows.size == 0:
+            return
+
+        ys = rows + y0
+        xs = cols + x0
+        blended = background[ys, xs].astype(np.uint16)
+        blended *= inv_alpha
+        blended = _div255(blended)
+        blended += premultiplied
+        background[ys, xs] = blended
+
+    def blit_many(self, background, crop_xs, crop_ys):
+        """
+        Blend copies of this sprite at several places in one set of array ops.
+        Callers must ensure the copies lie inside the frame and do not overlap.
+
+        Args:
+            background: BGR uint8 frame
+            crop_xs, crop_ys: Arrays of top-left positions of the cropped sprite
+        """
+        if self.crop_h == 0:
+            return
+        if self._dense is None:
+            # Dense form for stacked blending: opaque pixels have inverse alpha 0,
+            # transparent ones 255 with no colour, so one formula covers all pixels
+            alpha = np.where(self.opaque[:, :, :1], 255, 0).astype(np.uint16)
+            alpha[self.soft_rows, self.soft_cols] = 255 - self.soft_inv_alpha
+            premultiplied = _div255(self.color.astype(np.uint16) * alpha)
+            self._dense = (premultiplied, 255 - alpha)
+        premultiplied, inv_alpha = self._dense
+
+        bh, bw, ch = background.shape
+        s0, s1, s2 = background.strides
+        windows = np.lib.stride_tricks.as_strided(
+            background, shape=(bh - self.crop_h + 1, bw - self.crop_w + 1, self.crop_h, self.crop_w, ch),
+            strides=(s0, s1, s0, s1, s2), writeable=True)
+
+        if self.solid:
+            windows[crop_ys, crop_xs] = self.color
+            return
+        blended = windows[crop_ys, crop_xs].astype(np.uint16)
+        blended *= inv_alpha
+        blended = _div255(blended)
+        blended += premultiplied
+        windows[crop_ys, crop_xs] = blended
+
+
+def composite(background, sprites, xs, ys, cull_above=64):
+    """
+    Composite a batch of sprites onto background in draw (list) order.
+    Sprites are sorted into layers in which no two sprites overlap, with
+    overlapping sprites keeping their draw order across layers. Within a
+    layer, sprites that share a template are blended as one stack of
+    windows, so a belt full of chips costs a few array operations per
+    template instead of a full blit per chip.
+
+    Args:
+        background: BGR uint8 frame, modified in place
+        sprites: List of Sprite objects in draw order
+        xs, ys: Top-left positions of the full (uncropped) sprites
+        cull_above: Batches larger than this skip sprites hidden behind later ones
+    """
+    if not sprites:
+        return
+    if len(sprites) == 1:
+        sprites[0].blit(background, int(xs[0]), int(ys[0]))
+        return
+
+    bh, bw = background.shape[:2]
+    xs = np.asarray(xs, dtype=np.intp)
+    ys = np.asarray(ys, dtype=np.intp)
+    left = xs + [s.offset_x for s in sprites]
+    upper = ys + [s.offset_y for s in sprites]
+    right = left + [s.crop_w for s in sprites]
+    lower = upper + [s.crop_h for s in sprites]
+    
+    # On a crowded belt most chips are hidden under later ones; drop those first
+    if len(sprites) > cull_above:
+        keep = _visible_boxes(sprites, left, upper, right, lower, bw, bh)
+        sprites = [sprites[i] for i in keep.tolist()]
+        xs, ys, left, upper, right, lower = (a[keep] for a in (xs, ys, left, upper, right, lower))
+    inside = ((left >= 0) & (upper >= 0) & (right <= bw) & (lower <= bh)).tolist()
+
+    # layer -> (sprite id -> chip indices fully inside the frame, chips clipped by the frame edge)
+    layers = {}
+    for i, layer in enumerate(_assign_layers(left, upper, right, lower, bw, bh)):
+        if layer < 0:
+            continue
+        stacks, clipped = layers.setdefault(layer, ({}, []))
+        if inside[i]:
+            stacks.setdefault(id(sprites[i]), []).append(i)
+        else:
+            clipped.append(i)
+
+    for layer in sorted(layers):
+        stacks, clipped = layers[layer]
+        for members in stacks.values():
+            sprites[members[0]].blit_many(background, left[members], upper[members])
+        for i in clipped:
+            sprites[i].blit(background, int(xs[i]), int(ys[i]))
+
+
+def _visible_boxes(sprites, left, upper, right, lower, bw, bh, cell=2):
+    """
+    Indices (in draw order) of sprites not completely hidden by later sprites.
+    Walks back to front over a coarse grid: a sprite whose cells are all
+    covered is culled, otherwise the cells wholly inside its opaque core
+    are marked covered. Covered cells are conservative, so nothing visible
+    is ever culled.
+    """
+    gw, gh = -(-bw // cell), -(-bh // cell)
+    gl = np.clip(left // cell, 0, gw).tolist()
+    gu = np.clip(upper // cell, 0, gh).tolist()
+    gr = np.clip(-(-right // cell), 0, gw).tolist()
+    gd = np.clip(-(-lower // cell), 0, gh).tolist()
+    left = left.tolist()
+    upper = upper.tolist()
+
+    covered = np.zeros((gh, gw), dtype=bool)
+    keep = []
+    for i in range(len(sprites) - 1, -1, -1):
+        l, u, r, d = gl[i], gu[i], gr[i], gd[i]
+        if r <= l or d <= u or covered[u:d, l:r].all():
+            continue
+        keep.append(i)
+
+        core = sprites[i].core
+        if core is not None:
+            r0, c0, r1, c1 = core
+            cl = -(-(left[i] + c0) // cell)
+            cu = -(-(upper[i] + r0) // cell)
+            cr = (left[i] + c1) // cell
+            cd = (upper[i] + r1) // cell
+            if cr > cl and cd > cu:
+                covered[max(cu, 0):max(cd, 0), max(cl, 0):max(cr, 0)] = True
+
+    keep.reverse()
+    return np.array(keep, dtype=np.intp)
+
+
+def _largest_rectangle(mask):
+    """
+    Largest all-True axis-aligned rectangle of a 2D mask
+
+    Returns:
+        tuple: (row0, col0, row1, col1) with exclusive ends, or None if mask is all False
+    """
+    heights = np.zeros(mask.shape[1], dtype=np.int64)
+    best = None
+    best_area = 0
+    for row, line in enumerate(mask):
+        heights = np.where(line, heights + 1, 0)
+        stack = []
+        for col, height in enumerate(heights.tolist() + [0]):
+            start = col
+            while stack and stack[-1][1] >= height:
+                start, top = stack.pop()
+                area = top * (col - start)
+                if area > best_area:
+                    best_area = area
+                    best = (row - top + 1, start, row + 1, col)
+            stack.append((start, height))
+    return best
+
+
+def _assign_layers(left, upper, right, lower, bw, bh, cell=8):
+    """
+    Give each box the lowest layer above every earlier box it overlaps.
+    Boxes are tracked on a coarse grid snapped outwards to cell boundaries,
+    so a near miss may cost an extra layer but an overlap is never missed.
+
+    Returns:
+        list: Layer per box, -1 for boxes entirely outside the frame
+    """
+    gw, gh = -(-bw // cell), -(-bh // cell)
+    gl = np.clip(left // cell, 0, gw).tolist()
+    gu = np.clip(upper // cell, 0, gh).tolist()
+    gr = np.clip(-(-right // cell), 0, gw).tolist()
+    gd = np.clip(-(-lower // cell), 0, gh).tolist()
+
+    next_free = np.zeros((gh, gw), dtype=np.int32)
+    layers = []
+    for l, u, r, d in zip(gl, gu, gr, gd):
+        if r <= l or d <= u:
+            layers.append(-1)
+            continue
+        cells = next_free[u:d, l:r]
+        layer = int(cells.max())
+        cells[...] = layer + 1
+        layers.append(layer)
+    return layers
+
+
+def _div255(values):
+    """Rounded division by 255 for uint16 products, without floats"""
+    values = values + 128
+    values += values >> 8
+    values >>= 8
+    return values
@@ -0,0 +1,151 @@
+"""
+Chip Templates
+Shared loader for the green-screen chip photos, with a persistent on-disk cache
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+from sprites import Sprite
+
+CHIP_TYPES = ['GOLD', 'SILVER', 'BRONZE']
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'templates')
+
+# Bump when the processing below changes, so stale cache entries are never read
+CACHE_VERSION = 1
+
+GREEN_LOWER = np.array([35, 40, 40])
+GREEN_UPPER = np.array([85, 255, 255])
+
+
+def remove_green_background(img):
+    """
+    Turn a green-screen photo into BGRA
+
+    Pixels inside the green HSV range become transparent, all others opaque.
+
+    Args:
+        img: BGR or BGRA image
+
+    Returns:
+        np.ndarray: BGRA image
+    """
+    bgr = img[:, :, :3]
+    green_mask = cv2.inRange(cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV), GREEN_LOWER, GREEN_UPPER)
+    return np.dstack([bgr, cv2.bitwise_not(green_mask)])
+
+
+def asset_path(chip_type, assets_dir=None):
+    return os.path.join(assets_dir or ASSETS_DIR, f"{chip_type.lower()}.png")
+
+
+def cached(name, params, sources, build, cache_dir=None, use_cache=True):
+    """
+    Build a set of named arrays once and memory-map them on later calls
+
+    The entry is keyed by the contents of the source files and the
+    processing parameters, so editing an asset or changing a parameter
+    makes a new entry instead of reading a stale one.
+
+    Args:
+        name: Entry name (readable prefix of the cache directory)
+        params: Processing parameters (anything with a stable repr)
+        sources: Files the arrays are derived from
+        build: build() -> dict of name -> np.ndarray
+        cache_dir: Cache root (CACHE_DIR when None)
+        use_cache: False always builds and never touches the disk
+
+    Returns:
+        dict: name -> array (read-only memory maps when served from the cache)
+    """
+    if not use_cache:
+        return build()
+
+    digest = hashlib.sha1(f"{CACHE_VERSION}|{name}|{params!r}".encode())
+    for path in sources:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    entry = os.path.join(cache_dir or CACHE_DIR, f"{name}-{digest.hexdigest()[:16]}")
+
+    if not os.path.isdir(entry):
+        arrays = build()
+        try:
+            # Written to a scratch directory and renamed, so a half-written entry is never read
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            scratch = tempfile.mkdtemp(dir=os.path.dirname(entry))
+            for key, array in arrays.items():
+                np.save(os.path.join(scratch, f"{_file_key(key)}.npy"), np.ascontiguousarray(array))
+            try:
+                os.rename(scratch, entry)
+            except OSError:
+                shutil.rmtree(scratch, ignore_errors=True)  # Another process got there first
+        except OSError as e:
+            print(f"⚠️  Template cache not written ({e})")
+        return arrays
+
+    return {_array_key(f[:-4]): np.asarray(np.load(os.path.join(entry, f), mmap_mode='r'))
+            for f in os.listdir(entry) if f.endswith('.npy')}
+
+
+def load_chip_assets(scale=1.0, chip_types=None, assets_dir=None, cache_dir=None, use_cache=True):
+    """
+    Load processed chip templates with their grayscale references and sprites
+
+    Args:
+        scale: Resize factor applied after background removal
+        chip_types: Chip types to load (all when None); missing files are skipped
+        assets_dir: Directory of <type>.png photos
+        cache_dir, use_cache: See cached()
+
+    Returns:
+        dict: chip type -> {'template': BGRA, 'gray': grayscale, 'sprite': Sprite}
+    """
+    assets = {}
+    for chip_type in chip_types or CHIP_TYPES:
+        path = asset_path(chip_type, assets_dir)
+        if not os.path.exists(path):
+            continue
+
+        def build(path=path):
+            img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if img is None:
+                return {}
+            if img.ndim == 2:
+                img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+            template = remove_green_background(img)
+            if scale != 1.0:
+                h, w = template.shape[:2]
+                template = cv2.resize(template, (int(w * scale), int(h * scale)))
+            arrays = {'template': template, 'gray': cv2.cvtColor(template[:, :, :3], cv2.COLOR_BGR2GRAY)}
+            arrays.update({f"sprite/{k}": v for k, v in Sprite(template).to_arrays().items()})
+            return arrays
+
+        arrays = cached(f"{chip_type.lower()}-x{scale:g}", (scale,), [path], build,
+                        cache_dir=cache_dir, use_cache=use_cache)
+        if not arrays:
+            continue
+        for array in arrays.values():
+            if array.flags.writeable:
+                array.setflags(write=False)
+        sprite = Sprite.from_arrays({k.split('/', 1)[1]: v for k, v in arrays.items() if k.startswith('sprite/')})
+        assets[chip_type] = {'template': arrays['template'], 'gray': arrays['gray'], 'sprite': sprite}
+    return assets
+
+
+def load_templates(scale=1.0, **kwargs):
+    """Processed BGRA templates only; see load_chip_assets"""
+    return {t: asset['template'] for t, asset in load_chip_assets(scale, **kwargs).items()}
+
+
+def _file_key(key):
+    return key.replace('/', '@')
+
+
+def _array_key(file_key):
+    return file_key.replace('@', '/')
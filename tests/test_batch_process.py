@@ -0,0 +1,49 @@
+"""
+Batch processing tests on recorded virtual camera footage
+"""
+
+import contextlib
+import io
+import json
+
+import cv2
+import pytest
+
+import batch_process
+from virtual_camera import VirtualCamera
+
+
+@pytest.fixture(scope='module')
+def footage(tmp_path_factory):
+    """Directory of 150 frames of seeded simulator footage"""
+    path = tmp_path_factory.mktemp('footage')
+    with contextlib.redirect_stdout(io.StringIO()):
+        camera = VirtualCamera(seed=1, realtime=False)
+    for index in range(150):
+        _, frame = camera.read_frame()
+        cv2.imwrite(str(path / f"{index:05d}.png"), frame)
+    camera.release()
+    return path
+
+
+@pytest.fixture(scope='module')
+def settings():
+    return batch_process.detector_settings(simulator=True)
+
+
+def counted(footage, settings, output, chunk_frames, workers):
+    """Records of a batch run, without the per-chunk track IDs"""
+    with contextlib.redirect_stderr(io.StringIO()):
+        batch_process.process(str(footage), str(output), chunk_frames, workers=workers, settings=settings)
+    with open(output, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    for record in records:
+        del record['id']
+    return records
+
+
+def test_chunked_run_matches_unchunked_run(footage, settings, tmp_path):
+    whole = counted(footage, settings, tmp_path / 'whole.jsonl', chunk_frames=150, workers=1)
+    chunked = counted(footage, settings, tmp_path / 'chunked.jsonl', chunk_frames=50, workers=3)
+    assert whole
+    assert chunked == whole
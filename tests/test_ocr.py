@@ -0,0 +1,60 @@
+"""
+DigitReader tests on synthetic chip ROIs
+"""
+
+import inspect
+
+import cv2
+import numpy as np
+
+from camera_main import ChipDetector
+from ocr import DigitReader
+
+MIN_CONFIDENCE = inspect.signature(ChipDetector).parameters['min_digit_confidence'].default
+
+
+def chip_roi(texts, size=120, font=cv2.FONT_HERSHEY_SIMPLEX, thickness=2):
+    """Dark chip with one text per digit cell of the digit row; several texts in a cell are overlaid"""
+    roi = np.full((size, size, 3), 40, dtype=np.uint8)
+    band_h = int(size * 0.3)
+    x0, width = int(size * 0.1), int(size * 0.8)
+    font_scale = cv2.getFontScaleFromHeight(font, int(band_h * 0.65), thickness)
+    for i, text in enumerate(texts):
+        for char in text:
+            (w, h), _ = cv2.getTextSize(char, font, font_scale, thickness)
+            origin = (x0 + int(width * (i + 0.5) / len(texts)) - w // 2, int(size * 0.1) + (band_h + h) // 2)
+            cv2.putText(roi, char, origin, font, font_scale, (230, 230, 230), thickness, cv2.LINE_AA)
+    return roi
+
+
+def test_clean_digits_are_read_confidently():
+    reader = DigitReader()
+    for text in ('729', '150', '384', '666'):
+        digits, confidences = reader.read(chip_roi(text))
+        assert digits == tuple(int(c) for c in text)
+        assert min(confidences) >= MIN_CONFIDENCE
+
+
+def test_ambiguous_cells_are_rejected():
+    # Two digits printed over each other (neither hiding the other) fit both about equally well
+    reader = DigitReader()
+    for pair in ('02', '13', '24', '25', '29'):
+        _, confidences = reader.read(chip_roi(['1', pair, '1']))
+        assert confidences[1] < MIN_CONFIDENCE
+
+
+def test_wrong_reads_are_rejected():
+    reader = DigitReader()
+    rng = np.random.default_rng(0)
+    wrong = 0
+    for font in DigitReader.FONTS:
+        for _ in range(100):
+            text = ''.join(str(d) for d in rng.integers(0, 10, 3))
+            roi = chip_roi(text, size=60, font=font, thickness=1)
+            roi = np.clip(roi + rng.normal(0, 40, roi.shape), 0, 255).astype(np.uint8)
+            digits, confidences = reader.read(roi)
+            for read, char, confidence in zip(digits, text, confidences):
+                if read != int(char):
+                    wrong += 1
+                    assert confidence < MIN_CONFIDENCE
+    assert wrong  # Small, noisy rows do produce misreads
@@ -0,0 +1,36 @@
+"""
+ChipTracker tests on virtual camera footage
+"""
+
+import contextlib
+import io
+
+import pytest
+
+from camera_main import CameraChipSystem
+from virtual_camera import VirtualCamera
+
+
+def verdicts(scan_band, frames=200, seed=0):
+    """(chip type, is_fake) of every chip committed at the scan line, in order"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        camera = VirtualCamera(seed=seed, realtime=False)
+        system = CameraChipSystem(camera=camera, threaded_capture=False, ledger_dir=None, scan_band=scan_band)
+        committed = []
+        for _ in range(frames):
+            _, frame = camera.read_frame()
+            _, crossed = system.process_frame(frame)
+            committed += [(track['chip_type'], track['is_fake']) for track in crossed]
+        camera.release()
+    return committed
+
+
+@pytest.fixture(scope='module')
+def full_frame():
+    return verdicts(scan_band=None)
+
+
+@pytest.mark.parametrize('scan_band', [240, 140])
+def test_scan_band_gives_full_frame_verdicts(full_frame, scan_band):
+    assert full_frame
+    assert verdicts(scan_band) == full_frame
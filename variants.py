@@ -0,0 +1,172 @@
+"""
+Counterfeit Variant Pool
+Pre-generated altered chip templates shared read-only between chips
+"""
+
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from sprites import Sprite
+
+ALTERATION_KINDS = ['noise', 'blur', 'color', 'rotate', 'crop']
+
+
+def make_variant(template, kind, seed):
+    """
+    Apply one alteration to a copy of a template, deterministically for a seed.
+    Module level so process pool workers can run it.
+
+    Args:
+        template: BGRA chip template
+        kind: One of ALTERATION_KINDS
+        seed: Integer seed for this variant
+
+    Returns:
+        np.ndarray: Altered BGRA template
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    altered = template.copy()
+
+    if kind == 'noise':
+        # Add noise
+        noise = np_rng.integers(-30, 30, altered.shape, dtype=np.int16)
+        altered = np.clip(altered.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    elif kind == 'blur':
+        # Add blur
+        altered[:, :, :3] = cv2.GaussianBlur(altered[:, :, :3], (15, 15), 0)
+
+    elif kind == 'color':
+        # Change color slightly
+        hsv = cv2.cvtColor(altered[:, :, :3], cv2.COLOR_BGR2HSV)
+        hsv[:, :, 0] = (hsv[:, :, 0] + rng.randint(10, 30)) % 180  # Hue shift
+        altered[:, :, :3] = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+    elif kind == 'rotate':
+        # Rotate slightly
+        h, w = altered.shape[:2]
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), rng.uniform(-15, 15), 1.0)
+        altered = cv2.warpAffine(altered, M, (w, h), borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0, 0))
+
+    elif kind == 'crop':
+        # Add black patches
+        h, w = altered.shape[:2]
+        for _ in range(rng.randint(2, 5)):
+            x1 = rng.randint(0, max(0, w - 20))
+            y1 = rng.randint(0, max(0, h - 20))
+            altered[y1:y1 + rng.randint(10, 30), x1:x1 + rng.randint(10, 30)] = 0
+
+    else:
+        raise ValueError(f"Unknown alteration kind: {kind}")
+
+    return altered
+
+
+class VariantPool:
+    """Altered templates per chip type and alteration kind, built in the background"""
+
+    def __init__(self, references, score, variants_per_kind=8, kinds=None, seed=0, processes=0):
+        """
+        Initialize pool (call start() to build it in the background)
+
+        Args:
+            references: Dict of chip type -> BGRA reference template
+            score: score(chip_type, templates) -> difference ratio per template
+            variants_per_kind: Variants kept per (chip type, kind) slot
+            kinds: Alteration kinds to pool (all when None)
+            seed: Base seed; every variant has its own seed derived from it
+            processes: Worker processes for generation (0 builds on the thread)
+        """
+        self.references = references
+        self.score = score
+        self.variants_per_kind = variants_per_kind
+        self.kinds = list(kinds or ALTERATION_KINDS)
+        self.seed = seed
+        self.processes = processes
+
+        # (chip type, kind) -> list of variants, filled once per slot
+        self.slots = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Build every slot on a background thread"""
+        self.thread = threading.Thread(target=self._build_all, daemon=True)
+        self.thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until the background build finishes"""
+        if self.thread:
+            self.thread.join(timeout)
+
+    def variant_seed(self, chip_type, kind, index):
+        """Deterministic seed of one variant"""
+        type_index = sorted(self.references).index(chip_type)
+        kind_index = self.kinds.index(kind)
+        return int(np.random.SeedSequence([self.seed, type_index, kind_index, index]).generate_state(1)[0])
+
+    def get(self, chip_type, kind=None, index=None, rng=None):
+        """
+        Pick a pooled variant; a slot not built yet is built right here
+
+        Args:
+            chip_type: Chip type
+            kind: Alteration kind (random when None)
+            index: Variant within the slot (random when None)
+            rng: random.Random for the random picks (module random when None)
+
+        Returns:
+            dict: Read-only 'template', shared 'sprite', 'difference' and 'kind'
+        """
+        rng = rng or random
+        if kind is None:
+            kind = rng.choice(self.kinds)
+        variants = self.slots.get((chip_type, kind))
+        if variants is None:
+            variants = self._build_slot(chip_type, kind)
+        if index is None:
+            index = rng.randrange(len(variants))
+        return variants[index]
+
+    def _build_all(self):
+        """Fill every slot, optionally generating the templates in worker processes"""
+        if self.processes:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                for chip_type in self.references:
+                    for kind in self.kinds:
+                        if (chip_type, kind) in self.slots:
+                            continue
+                        seeds = [self.variant_seed(chip_type, kind, i) for i in range(self.variants_per_kind)]
+                        templates = list(executor.map(make_variant, [self.references[chip_type]] * len(seeds),
+                                                      [kind] * len(seeds), seeds))
+                        self._store_slot(chip_type, kind, templates)
+        else:
+            for chip_type in self.references:
+                for kind in self.kinds:
+                    if (chip_type, kind) not in self.slots:
+                        self._build_slot(chip_type, kind)
+
+    def _build_slot(self, chip_type, kind):
+        """Generate one slot in the calling thread"""
+        reference = self.references[chip_type]
+        templates = [make_variant(reference, kind, self.variant_seed(chip_type, kind, i))
+                     for i in range(self.variants_per_kind)]
+        return self._store_slot(chip_type, kind, templates)
+
+    def _store_slot(self, chip_type, kind, templates):
+        """Score, freeze and publish a slot; the first build of a slot wins"""
+        differences = self.score(chip_type, templates)
+        variants = []
+        for template, difference in zip(templates, differences):
+            template.setflags(write=False)
+            variants.append({'template': template, 'sprite': Sprite(template),
+                             'difference': float(difference), 'kind': kind})
+
+        with self.lock:
+            return self.slots.setdefault((chip_type, kind), variants)
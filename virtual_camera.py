@@ -0,0 +1,425 @@
+"""
+Virtual Camera
+ConveyorSimulator frames behind the camera interface, with ground truth and
+optional sensor effects, so the camera pipeline runs without hardware
+"""
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+from authenticity import ReferenceAuthenticator
+from main import ConveyorSimulator
+from markers import encode_marker
+
+DISPLAY_COLORS = {'GOLD': (0, 215, 255), 'SILVER': (200, 200, 200), 'BRONZE': (0, 100, 200)}
+
+
+def simulator_color_ranges(sim):
+    """
+    Derive HSV ranges from the coloured marks on the simulator's chip templates
+
+    The chip bodies look alike for every type, so only the marks tell the
+    types apart; simulator_body_range covers the bodies.
+
+    Args:
+        sim: ConveyorSimulator with loaded templates
+
+    Returns:
+        dict: Color ranges in ChipDetector format
+    """
+    color_ranges = {}
+
+    for chip_type, template in sim.reference_templates.items():
+        hsv = cv2.cvtColor(template[:, :, :3], cv2.COLOR_BGR2HSV)
+        marks = (template[:, :, 3] > 128) & (hsv[:, :, 1] > 100) & (hsv[:, :, 2] > 100)
+        low = np.percentile(hsv[marks], 2, axis=0)
+        high = np.percentile(hsv[marks], 98, axis=0)
+        color_ranges[chip_type] = {
+            'lower': np.maximum(low - [4, 40, 40], 0).astype(np.uint8),
+            'upper': np.minimum(high + [4, 40, 40], [180, 255, 255]).astype(np.uint8),
+            'bgr_color': DISPLAY_COLORS.get(chip_type, (255, 255, 255)),
+            'value_multiplier': 1
+        }
+
+    return color_ranges
+
+
+def render_on_belt(sim, chip_type, margin=0, sprite=None):
+    """
+    A reference chip composited onto a stretch of belt between two stripes,
+    as the camera sees it (the green-screen cut leaves pinholes in the alpha)
+
+    Args:
+        sim: ConveyorSimulator with loaded templates
+        chip_type: Chip type to render
+        margin: Belt in px left around the template
+        sprite: Sprite drawn instead of the reference (a counterfeit variant)
+
+    Returns:
+        np.ndarray: BGR image the size of the chip template plus margins
+    """
+    template = sim.reference_templates[chip_type]
+    h, w = template.shape[:2]
+    texture = sim.build_belt_texture() if sim.belt_texture is None else sim.belt_texture
+    patch = texture[3:3 + h + 2 * margin, sim.belt_x + 10:sim.belt_x + 10 + w + 2 * margin].copy()
+    (sprite or sim.chip_sprites[chip_type]).blit(patch, margin, margin)
+    return patch
+
+
+def simulator_body_range(sim, color_ranges=None, blur=5):
+    """
+    Derive the HSV range of the simulator's chip bodies, shared by every type
+
+    Pixels are taken from the chips as rendered on the belt and blurred like
+    the detector blurs them, so the green showing through the pinholes is
+    part of the body; the marks (color_ranges) are left out.
+
+    Args:
+        sim: ConveyorSimulator with loaded templates
+        color_ranges: Mark ranges (simulator_color_ranges when None)
+        blur: Detector blur kernel size
+
+    Returns:
+        dict: 'lower' and 'upper' HSV bounds (ChipDetector body_range)
+    """
+    if color_ranges is None:
+        color_ranges = simulator_color_ranges(sim)
+
+    pixels = []
+    for chip_type, template in sim.reference_templates.items():
+        hsv = cv2.cvtColor(cv2.GaussianBlur(render_on_belt(sim, chip_type), (blur, blur), 0), cv2.COLOR_BGR2HSV)
+        body = cv2.erode((template[:, :, 3] > 128).astype(np.uint8), np.ones((3, 3), np.uint8)) > 0
+        for color in color_ranges.values():
+            body &= cv2.inRange(hsv, color['lower'], color['upper']) == 0
+        pixels.append(hsv[body])
+
+    pixels = np.concatenate(pixels)
+    return {
+        'lower': np.percentile(pixels, 2, axis=0).astype(np.uint8),
+        'upper': np.percentile(pixels, 98, axis=0).astype(np.uint8)
+    }
+
+
+def chip_box(chip):
+    """
+    Frame box (x, y, w, h) of a simulator chip's drawn pixels; counterfeit
+    variants can leave rows or columns of the template transparent
+    """
+    sprite = chip['sprite']
+    return (int(chip['x']) + sprite.offset_x, int(chip['y']) + sprite.offset_y, sprite.crop_w, sprite.crop_h)
+
+
+def frame_truth(sim):
+    """
+    Chips drawn in the simulator's current frame
+
+    Returns:
+        list: Dicts of id, chip_type, bbox (clipped to the frame), whole (not
+              cut by the frame edge), value and authentic
+    """
+    truth = []
+    for i in sim.chips.visible(sim.height).tolist():
+        chip = sim.chips[i]
+        x, y, w, h = chip_box(chip)
+        top, bottom = max(y, 0), min(y + h, sim.height)
+        if bottom <= top:
+            continue
+        truth.append({'id': chip['id'], 'chip_type': chip['type'], 'bbox': (x, top, w, bottom - top),
+                      'whole': top == y and bottom == y + h,
+                      'value': chip['value'], 'authentic': chip['authentic']})
+    return truth
+
+
+def simulator_min_chip_area(sim):
+    """
+    A quarter of the opaque area of the smallest simulator chip, in px
+    (the 'crop' counterfeits lose large parts of the chip)
+    """
+    return int(min((template[:, :, 3] > 128).sum() for template in sim.reference_templates.values()) // 4)
+
+
+def simulator_authenticator(sim, color_ranges=None, body_range=None, margin=8):
+    """
+    ReferenceAuthenticator for simulator chips
+
+    Each reference is the simulator's template rendered on the belt and cut
+    to the box the detector finds around it, so references are framed like
+    live crops and show the same pinholes.
+
+    Args:
+        sim: ConveyorSimulator with loaded templates
+        color_ranges, body_range: Detector ranges (derived from sim when None)
+        margin: Belt in px rendered around each reference for the detector
+    """
+    from camera_main import ChipDetector
+
+    if color_ranges is None:
+        color_ranges = simulator_color_ranges(sim)
+    if body_range is None:
+        body_range = simulator_body_range(sim, color_ranges)
+    detector = ChipDetector(color_ranges=color_ranges, body_range=body_range)
+    detector.min_area = simulator_min_chip_area(sim)
+
+    references = {}
+    for chip_type in sim.reference_templates:
+        patch = render_on_belt(sim, chip_type, margin)
+        candidates = detector.find_candidates(patch)
+        if not candidates:
+            continue
+        _, (x, y, w, h), _ = max(candidates, key=lambda candidate: candidate[2])
+        references[chip_type] = patch[y:y + h, x:x + w]
+    return ReferenceAuthenticator(references)
+
+
+class VirtualCamera:
+    """
+    Camera backed by a ConveyorSimulator, with the read_frame()/release()
+    interface of CameraManager.
+
+    Each read steps the belt one frame and returns the bare belt (no labels
+    or HUD), with the chips in view as ground truth. Sensor noise, lens
+    blur and a slow exposure drift can be layered on, all drawn from the seed.
+    """
+
+    def __init__(self, simulator=None, seed=None, realtime=True, noise=0.0, blur=0, exposure_drift=0.0,
+                 drift_period=20.0, embed_markers=False, warmup=120):
+        """
+        Initialize virtual camera
+
+        Args:
+            simulator: ConveyorSimulator to film (a quiet one is made when None)
+            seed: Simulator and sensor-effect seed (random when None)
+            realtime: Block in read_frame() until the next frame is due, like a real camera;
+                      False serves frames as fast as they are requested
+            noise: Standard deviation of the per-pixel sensor noise, in grey levels
+            blur: Gaussian blur kernel size in px (0 for none)
+            exposure_drift: Peak relative brightness change of the exposure drift (0.2 = ±20%)
+            drift_period: Seconds of simulated time per exposure drift cycle
+            embed_markers: Stamp frame markers for latency measurement (see markers.py)
+            warmup: Frames stepped up front so the belt is already carrying chips
+        """
+        if simulator is None:
+            simulator = ConveyorSimulator(width=1280, height=720, conveyor_speed=3, seed=seed)
+            simulator.verbose = False
+        self.sim = simulator
+        self.realtime = realtime
+        self.noise = noise
+        self.blur = blur | 1 if blur > 1 else 0
+        self.exposure_drift = exposure_drift
+        self.drift_period = drift_period
+        self.embed_markers = embed_markers
+
+        self.rng = np.random.default_rng(self.sim.seed)
+        self.noise_bank = None
+
+        # Detector settings and references for the simulator's chips, which are far
+        # smaller than chips in front of a real camera and typed only by their marks
+        self.color_ranges = simulator_color_ranges(self.sim)
+        self.body_range = simulator_body_range(self.sim, self.color_ranges)
+        self.min_chip_area = simulator_min_chip_area(self.sim)
+        self.authenticator = simulator_authenticator(self.sim, self.color_ranges, self.body_range)
+
+        self.truth = []  # Chips in view in the latest frame (see frame_truth)
+        self.scanned = []  # Chips the simulator counted at the scan line in the latest frame
+        self.frames = 0
+        self.next_frame_time = None
+        self.released = False
+
+        for _ in self.sim.run_headless(frames=warmup, render=False):
+            pass
+
+    def read_frame(self):
+        """
+        Capture the next frame
+
+        Returns:
+            tuple: (success, frame)
+        """
+        if self.released:
+            return False, None
+
+        if self.realtime:
+            now = time.perf_counter()
+            if self.next_frame_time is None or self.next_frame_time < now - 1.0:
+                self.next_frame_time = now
+            elif self.next_frame_time > now:
+                time.sleep(self.next_frame_time - now)
+            self.next_frame_time += 1.0 / self.sim.frame_rate
+
+        self.scanned = self.sim.step()
+        frame = self.sim.render_frame(annotate=False)
+        self.truth = self.ground_truth()
+        frame = self.apply_sensor(frame)
+        if self.embed_markers:
+            encode_marker(frame, self.sim.frame_count)
+        self.frames += 1
+        return True, frame
+
+    def ground_truth(self):
+        """Chips in the latest frame; see frame_truth"""
+        return frame_truth(self.sim)
+
+    def apply_sensor(self, frame):
+        """Exposure drift, then blur, then noise; the frame is returned unchanged when all are off"""
+        if self.exposure_drift:
+            t = self.sim.frame_count / self.sim.frame_rate
+            gain = 1.0 + self.exposure_drift * math.sin(2 * math.pi * t / self.drift_period)
+            frame = cv2.convertScaleAbs(frame, alpha=gain)
+        if self.blur:
+            frame = cv2.GaussianBlur(frame, (self.blur, self.blur), 0)
+        if self.noise:
+            # Fresh Gaussian noise per frame is slow at 1280x720, so frames take
+            # a random window of a seeded noise field twice the frame height
+            if self.noise_bank is None:
+                shape = (frame.shape[0] * 2,) + frame.shape[1:]
+                self.noise_bank = np.clip(self.rng.normal(0, self.noise, shape), -128, 127).astype(np.int16)
+            offset = int(self.rng.integers(frame.shape[0]))
+            frame = cv2.add(frame, self.noise_bank[offset:offset + frame.shape[0]], dtype=cv2.CV_8U)
+        return frame
+
+    def release(self):
+        """Stop serving frames"""
+        self.released = True
+        self.sim.ledger.close()
+
+
+def run_benchmark(frames=300, seed=0, noise=0.0, blur=0, exposure_drift=0.0, detection_scale=1.0,
+                  scan_band=None):
+    """
+    Run the full camera pipeline (detection, tracking, reading, counting) on
+    virtual camera frames and score it against the simulator
+
+    The simulator draws each chip's value digits at random and never onto
+    the chip art, so no chip can be read: values are not scored, and the
+    unreadable count is reported instead.
+
+    Returns:
+        dict: Throughput and accuracy figures
+    """
+    from camera_main import CameraChipSystem
+    from benchmark_detection import score_detections
+
+    camera = VirtualCamera(seed=seed, realtime=False, noise=noise, blur=blur, exposure_drift=exposure_drift)
+    system = CameraChipSystem(camera=camera, threaded_capture=False, ledger_dir=None,
+                              detection_scale=detection_scale, scan_band=scan_band)
+
+    found = wrong = false_pos = total = 0
+    truth_scanned = []
+    elapsed = 0.0
+    for _ in range(frames):
+        _, frame = camera.read_frame()
+        start = time.perf_counter()
+        system.process_frame(frame)
+        elapsed += time.perf_counter() - start
+
+        truth = [(chip['chip_type'], chip['bbox']) for chip in camera.truth]
+        whole = [i for i, chip in enumerate(camera.truth) if chip['whole']]
+        f, w, u = score_detections(system.tracker.visible_tracks(), truth, whole)
+        found += f
+        wrong += w
+        false_pos += u
+        total += len(whole)
+        truth_scanned += camera.scanned
+    camera.release()
+
+    counted = system.ledger
+    results = {
+        'frames': frames,
+        'fps': frames / elapsed if elapsed else 0.0,
+        'recall': found / total if total else 0.0,
+        'type_errors': wrong,
+        'false_positives': false_pos,
+        'scanned_truth': len(truth_scanned),
+        'scanned_counted': counted.count,
+        'fakes_truth': sum(not entry['authentic'] for entry in truth_scanned),
+        'fakes_counted': counted.fake_count,
+        'unreadable_counted': counted.unreadable_count
+    }
+
+    print(f"\n📊 Virtual Camera Benchmark")
+    print("="*60)
+    print(f"Frames: {frames} | Noise: {noise} | Blur: {blur} | Exposure drift: ±{exposure_drift:.0%} | "
+          f"Scale: {detection_scale}" + (f" | Scan band: {scan_band}px" if scan_band else ""))
+    print(f"Pipeline: {elapsed / frames * 1000:.2f} ms/frame ({results['fps']:.1f} FPS)")
+    print(f"Tracks: recall {results['recall']:.1%} over {total} chips in view | "
+          f"{wrong} type errors | {false_pos} false positives")
+    print(f"Counted at scan line: {counted.count}/{len(truth_scanned)} chips | "
+          f"fakes flagged {counted.fake_count} (truth {results['fakes_truth']})")
+    print(f"Values: not measured (simulator chips carry no digits) | "
+          f"{counted.unreadable_count}/{counted.count} counted chips unreadable")
+    print("="*60 + "\n")
+    return results
+
+
+def run_authenticity_benchmark(chips=400, seed=0, margin=8):
+    """
+    Score the assets authenticator and the simulator authenticator on
+    spawned simulator chips, each rendered alone on the belt and cut to the
+    box the detector finds
+
+    Returns:
+        dict: Authenticator name -> (real chips flagged, fakes flagged)
+    """
+    from camera_main import ChipDetector
+
+    sim = ConveyorSimulator(seed=seed)
+    sim.verbose = False
+    sim.spawn_chips(chips)
+    color_ranges = simulator_color_ranges(sim)
+    body_range = simulator_body_range(sim, color_ranges)
+    detector = ChipDetector(color_ranges=color_ranges, body_range=body_range)
+    detector.min_area = simulator_min_chip_area(sim)
+    authenticators = {
+        'assets': ReferenceAuthenticator.from_assets(),
+        'simulator': simulator_authenticator(sim, color_ranges, body_range, margin)
+    }
+
+    flagged = {name: [0, 0] for name in authenticators}
+    real = fake = missed = 0
+    for i in range(len(sim.chips)):
+        chip = sim.chips[i]
+        patch = render_on_belt(sim, chip['type'], margin, chip['sprite'])
+        candidates = detector.find_candidates(patch)
+        if not candidates:
+            missed += 1
+            continue
+        _, (x, y, w, h), _ = max(candidates, key=lambda candidate: candidate[2])
+        crop = patch[y:y + h, x:x + w]
+        real += bool(chip['authentic'])
+        fake += not chip['authentic']
+        for name, authenticator in authenticators.items():
+            if authenticator.descriptors and authenticator.check(chip['type'], crop)['is_fake']:
+                flagged[name][0 if chip['authentic'] else 1] += 1
+
+    print(f"\n📊 Authenticity Benchmark")
+    print("="*60)
+    print(f"Chips: {chips} | Seed: {seed} | Not detected: {missed}")
+    for name, (real_flagged, fakes_flagged) in flagged.items():
+        print(f"{name:>10}: real flagged {real_flagged}/{real} | fakes flagged {fakes_flagged}/{fake}")
+    print("="*60 + "\n")
+    return {name: tuple(counts) for name, counts in flagged.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the camera pipeline on a simulator-backed virtual camera")
+    parser.add_argument('--frames', type=int, default=300, help="Frames to process")
+    parser.add_argument('--seed', type=int, default=0, help="Simulator and sensor seed")
+    parser.add_argument('--noise', type=float, default=0.0, help="Sensor noise standard deviation (grey levels)")
+    parser.add_argument('--blur', type=int, default=0, help="Lens blur kernel size in px")
+    parser.add_argument('--exposure-drift', type=float, default=0.0, help="Peak exposure change (0.2 = ±20%%)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Detection scale (see ChipDetector)")
+    parser.add_argument('--scan-band', type=int, default=None, help="Only process this many rows around the scan line")
+    parser.add_argument('--authenticity', type=int, default=None, metavar='CHIPS',
+                        help="Score the authenticators on this many spawned chips instead")
+    args = parser.parse_args()
+
+    if args.authenticity:
+        run_authenticity_benchmark(args.authenticity, args.seed)
+    else:
+        run_benchmark(args.frames, args.seed, args.noise, args.blur, args.exposure_drift, args.scale,
+                      args.scan_band)